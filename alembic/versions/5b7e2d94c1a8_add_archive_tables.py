@@ -0,0 +1,70 @@
+"""add archive tables
+
+Revision ID: 5b7e2d94c1a8
+Revises: a3f1c9d27b64
+Create Date: 2026-10-19 11:48:09.417352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2d94c1a8'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c9d27b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('event_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('title', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('location', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('booked_seats', sa.Integer(), nullable=False),
+    sa.Column('organizer_id', sa.Uuid(), nullable=True),
+    sa.ForeignKeyConstraint(['organizer_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_event_archive_organizer_id_date', 'event_archive', ['organizer_id', 'date'], unique=False)
+
+    op.create_table('booking_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('event_id', sa.Uuid(), nullable=False),
+    sa.Column('booking_date', postgresql.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('status', postgresql.ENUM(name='booking_status_enum', create_type=False), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_booking_archive_user_id_booking_date', 'booking_archive', ['user_id', 'booking_date'], unique=False)
+    op.create_index('ix_booking_archive_event_id', 'booking_archive', ['event_id'], unique=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_booking_cancelled_booking_date',
+            'booking',
+            ['booking_date'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text("status = 'cancelled'"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_cancelled_booking_date', table_name='booking', if_exists=True)
+    op.drop_index('ix_booking_archive_event_id', table_name='booking_archive')
+    op.drop_index('ix_booking_archive_user_id_booking_date', table_name='booking_archive')
+    op.drop_table('booking_archive')
+    op.drop_index('ix_event_archive_organizer_id_date', table_name='event_archive')
+    op.drop_table('event_archive')
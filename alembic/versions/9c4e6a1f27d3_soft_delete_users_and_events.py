@@ -0,0 +1,46 @@
+"""soft delete users and events
+
+Revision ID: 9c4e6a1f27d3
+Revises: 5b7e2d94c1a8
+Create Date: 2026-10-19 12:31:52.106448
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e6a1f27d3'
+down_revision: Union[str, Sequence[str], None] = '5b7e2d94c1a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default, so adding the columns does not rewrite the tables
+    op.add_column('user', sa.Column('deleted_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('event', sa.Column('deleted_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for name, table in (('ix_user_deleted_at', 'user'), ('ix_event_deleted_at', 'event')):
+            op.create_index(
+                name,
+                table,
+                ['deleted_at'],
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text('deleted_at IS NOT NULL'),
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_deleted_at', table_name='event', if_exists=True)
+    op.drop_index('ix_user_deleted_at', table_name='user', if_exists=True)
+    op.drop_column('event', 'deleted_at')
+    op.drop_column('user', 'deleted_at')
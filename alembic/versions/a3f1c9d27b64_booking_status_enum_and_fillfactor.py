@@ -0,0 +1,114 @@
+"""booking status enum and event fillfactor
+
+Revision ID: a3f1c9d27b64
+Revises: eb8072ffb1b7
+Create Date: 2026-10-19 11:03:27.884190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d27b64'
+down_revision: Union[str, Sequence[str], None] = 'eb8072ffb1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+# Keeps the new column in step with writes from app instances still running
+# the previous release while the backfill is in progress.
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION booking_status_sync() RETURNS trigger AS $$
+BEGIN
+    NEW.status_code := NEW.status::booking_status_enum;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+SYNC_TRIGGER = """
+CREATE TRIGGER booking_status_sync
+BEFORE INSERT OR UPDATE OF status ON booking
+FOR EACH ROW EXECUTE FUNCTION booking_status_sync();
+"""
+
+BACKFILL_BATCH = f"""
+UPDATE booking SET status_code = status::booking_status_enum
+WHERE id IN (SELECT id FROM booking WHERE status_code IS NULL LIMIT {BATCH_SIZE})
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing UUIDv4 keys stay as they are; new rows get UUIDv7 from the models.
+
+    # Only affects newly written pages, so no table rewrite is needed
+    op.execute("ALTER TABLE event SET (fillfactor = 80)")
+
+    status_enum = postgresql.ENUM('confirmed', 'cancelled', name='booking_status_enum')
+    status_enum.create(op.get_bind(), checkfirst=True)
+
+    # Convert status through a shadow column instead of ALTER COLUMN TYPE,
+    # which would rewrite the table under an ACCESS EXCLUSIVE lock.
+    op.add_column('booking', sa.Column('status_code', postgresql.ENUM(name='booking_status_enum', create_type=False), nullable=True))
+    op.execute(SYNC_FUNCTION)
+    op.execute(SYNC_TRIGGER)
+
+    with op.get_context().autocommit_block():
+        if op.get_context().as_sql:
+            op.execute("UPDATE booking SET status_code = status::booking_status_enum WHERE status_code IS NULL")
+        else:
+            bind = op.get_bind()
+            while bind.execute(sa.text(BACKFILL_BATCH)).rowcount:
+                pass
+
+        # A validated CHECK lets SET NOT NULL below skip its full-table scan
+        op.execute("ALTER TABLE booking ADD CONSTRAINT booking_status_code_not_null CHECK (status_code IS NOT NULL) NOT VALID")
+        op.execute("ALTER TABLE booking VALIDATE CONSTRAINT booking_status_code_not_null")
+
+    # Short swap; the partial guest-list index goes with the old column
+    op.execute("DROP TRIGGER booking_status_sync ON booking")
+    op.execute("DROP FUNCTION booking_status_sync()")
+    op.drop_column('booking', 'status')
+    op.alter_column('booking', 'status_code', new_column_name='status')
+    op.alter_column('booking', 'status', nullable=False, server_default='confirmed')
+    op.drop_constraint('booking_status_code_not_null', 'booking', type_='check')
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_booking_event_id_confirmed',
+            'booking',
+            ['event_id', 'user_id'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text("status = 'confirmed'"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_event_id_confirmed', table_name='booking', if_exists=True)
+    op.alter_column('booking', 'status',
+               existing_type=postgresql.ENUM('confirmed', 'cancelled', name='booking_status_enum'),
+               type_=sa.VARCHAR(),
+               server_default=None,
+               existing_nullable=False,
+               postgresql_using="status::text")
+    op.create_index(
+        'ix_booking_event_id_confirmed',
+        'booking',
+        ['event_id', 'user_id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'confirmed'"),
+    )
+
+    status_enum = postgresql.ENUM('confirmed', 'cancelled', name='booking_status_enum')
+    status_enum.drop(op.get_bind(), checkfirst=True)
+
+    op.execute("ALTER TABLE event RESET (fillfactor)")
@@ -0,0 +1,106 @@
+"""user booking and hosted event counters
+
+Revision ID: d7a3b5e81f40
+Revises: 9c4e6a1f27d3
+Create Date: 2026-10-19 13:14:06.527913
+
+"""
+from typing import Sequence, Union
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3b5e81f40'
+down_revision: Union[str, Sequence[str], None] = '9c4e6a1f27d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+# (counter column on user, referencing column, tables counted)
+# Archive tables count too, so moving rows to cold storage nets out to zero.
+COUNTERS = [
+    ('booking_count', 'user_id', ('booking', 'booking_archive')),
+    ('hosted_event_count', 'organizer_id', ('event', 'event_archive')),
+]
+
+# Statement-level triggers aggregate the transition table, so the batched
+# archive and purge jobs do one UPDATE per affected user rather than per row.
+COUNTER_FUNCTION = """
+CREATE OR REPLACE FUNCTION user_{counter}_{suffix}() RETURNS trigger AS $$
+BEGIN
+    UPDATE "user" u SET {counter} = u.{counter} {sign} d.n
+    FROM (SELECT {key}, count(*) AS n FROM changed_rows GROUP BY {key}) d
+    WHERE u.id = d.{key};
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+COUNTER_TRIGGER = """
+CREATE TRIGGER {table}_{counter}_{name}
+AFTER {event} ON {table}
+REFERENCING {transition} TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION user_{counter}_{suffix}();
+"""
+
+RECOUNT = """
+UPDATE "user" u SET
+    booking_count = (SELECT count(*) FROM booking WHERE user_id = u.id)
+                  + (SELECT count(*) FROM booking_archive WHERE user_id = u.id),
+    hosted_event_count = (SELECT count(*) FROM event WHERE organizer_id = u.id)
+                       + (SELECT count(*) FROM event_archive WHERE organizer_id = u.id)
+"""
+
+BACKFILL_BATCH = RECOUNT + f"""
+WHERE u.id IN (SELECT id FROM "user" WHERE id > :last_id ORDER BY id LIMIT {BATCH_SIZE})
+RETURNING u.id
+"""
+
+# (trigger event, transition table, function suffix, sign)
+OPERATIONS = [
+    ('INSERT', 'NEW', 'inc', '+'),
+    ('DELETE', 'OLD', 'dec', '-'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('booking_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('user', sa.Column('hosted_event_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Triggers go in before the backfill so no write lands uncounted
+    for counter, key, tables in COUNTERS:
+        for event, transition, suffix, sign in OPERATIONS:
+            op.execute(COUNTER_FUNCTION.format(counter=counter, key=key, suffix=suffix, sign=sign))
+            for table in tables:
+                op.execute(COUNTER_TRIGGER.format(table=table, counter=counter, name=event.lower(), event=event, transition=transition, suffix=suffix))
+
+    # One short transaction per batch of users. A write racing a batch can
+    # leave that user off by one; `python -m app.db.counters --fix` repairs it.
+    with op.get_context().autocommit_block():
+        if op.get_context().as_sql:
+            op.execute(RECOUNT)
+        else:
+            bind = op.get_bind()
+            last_id = uuid.UUID(int=0)
+            while True:
+                ids = bind.execute(sa.text(BACKFILL_BATCH), {'last_id': last_id}).scalars().all()
+                if not ids:
+                    break
+                last_id = max(ids)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for counter, key, tables in COUNTERS:
+        for event, transition, suffix, sign in OPERATIONS:
+            for table in tables:
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_{counter}_{event.lower()} ON {table}")
+            op.execute(f"DROP FUNCTION IF EXISTS user_{counter}_{suffix}()")
+
+    op.drop_column('user', 'hosted_event_count')
+    op.drop_column('user', 'booking_count')
@@ -0,0 +1,39 @@
+"""user role listing index
+
+Revision ID: e2f8c4a96b15
+Revises: d7a3b5e81f40
+Create Date: 2026-10-19 13:52:40.318276
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f8c4a96b15'
+down_revision: Union[str, Sequence[str], None] = 'd7a3b5e81f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination of the admin attendee/organizer listings
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_role_id',
+            'user',
+            ['role', 'id'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text('deleted_at IS NULL'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_role_id', table_name='user', if_exists=True, postgresql_concurrently=True)
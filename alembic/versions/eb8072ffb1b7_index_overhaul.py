@@ -0,0 +1,86 @@
+"""index overhaul
+
+Revision ID: eb8072ffb1b7
+Revises: 7f29d47dc5e2
+Create Date: 2026-10-19 10:12:41.502117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eb8072ffb1b7'
+down_revision: Union[str, Sequence[str], None] = '7f29d47dc5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, partial predicate)
+INDEXES = [
+    # Upcoming-only listings and search filter and sort on date
+    ('ix_event_date', 'event', ['date'], None),
+    # Organizer event counts, get_user_stats and cascades from user delete
+    ('ix_event_organizer_id_date', 'event', ['organizer_id', 'date'], None),
+    # FK cascades from event delete touch every booking of the event
+    ('ix_booking_event_id', 'booking', ['event_id'], None),
+    # Guest list: confirmed bookings of one event, joined to user on user_id
+    ('ix_booking_event_id_confirmed', 'booking', ['event_id', 'user_id'], "status = 'confirmed'"),
+    # My bookings, newest first
+    ('ix_booking_user_id_booking_date', 'booking', ['user_id', 'booking_date'], None),
+]
+
+# The primary key already enforces uniqueness of id; the extra UNIQUE (id)
+# constraints created by the init and "changes" revisions only double the
+# index maintenance on every insert. Their names were generated by Postgres,
+# so look them up instead of hardcoding them.
+DROP_REDUNDANT_ID_UNIQUES = """
+DO $$
+DECLARE
+    con record;
+BEGIN
+    FOR con IN
+        SELECT c.conname, t.relname
+        FROM pg_constraint c
+        JOIN pg_class t ON t.oid = c.conrelid
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = c.conkey[1]
+        WHERE c.contype = 'u'
+          AND t.relnamespace = current_schema()::regnamespace
+          AND t.relname IN ('user', 'event', 'booking')
+          AND array_length(c.conkey, 1) = 1
+          AND a.attname = 'id'
+    LOOP
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', con.relname, con.conname);
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(DROP_REDUNDANT_ID_UNIQUES)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+    op.create_unique_constraint('user_id_key', 'user', ['id'])
+    op.create_unique_constraint('event_id_key', 'event', ['id'])
+    op.create_unique_constraint('booking_id_key', 'booking', ['id'])
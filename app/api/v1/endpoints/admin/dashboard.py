@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.security import RoleChecker, get_current_user
 from app.db.models.user import User, Role
-from app.db.async_session import get_db
+from app.db.async_session import get_db, engine, replica_engine
+from app.db.pool_metrics import get_pool_stats
 from app.services.admin_service import admin_service
+from app.services.purge_service import purge_service
+from app.services.chatbot_tools import tool_stats
+from app.services.chatbot_cache import response_cache
+from app.services.chatbot_service import chatbot_service
 from app.schemas.admin import (
     AdminMessageResponse,
     AdminResponseBase,
     AdminEmailUpdateRequest,
     AdminPasswordUpdateRequest,
     AdminUpdate,
+    PoolStatsResponse,
+    ToolTokenStats,
+    ResponseCacheStats,
+    IntentStats,
+    ReflectionStats,
+    ChatStatsResponse,
 )
 
 router = APIRouter()
@@ -26,6 +39,30 @@ async def get_admin_details(current_user: User = Depends(get_current_user), _: b
         role=current_user.role
     )
 
+@router.get("/db-pool", response_model=List[PoolStatsResponse], status_code=status.HTTP_200_OK)
+async def get_db_pool_stats(current_user: User = Depends(get_current_user), _: bool = Depends(role_checker)):
+    """Connection pool usage (primary and replica) for the worker serving this request."""
+    
+    engines = [engine] if replica_engine is engine else [engine, replica_engine]
+    return [PoolStatsResponse(**get_pool_stats(e)) for e in engines]
+
+@router.get("/chat-stats", response_model=ChatStatsResponse, status_code=status.HTTP_200_OK)
+async def get_chat_stats(current_user: User = Depends(get_current_user), _: bool = Depends(role_checker)):
+    """Chatbot counters for the worker serving this request."""
+
+    return ChatStatsResponse(
+        pid=os.getpid(),
+        tools=[ToolTokenStats(name=name, **stats) for name, stats in sorted(tool_stats.items())],
+        cache=ResponseCacheStats(
+            hits=response_cache.stats["hits"],
+            misses=response_cache.stats["misses"],
+            stored=response_cache.stats["stored"],
+            entries=len(response_cache),
+        ),
+        intents=IntentStats(**{field: chatbot_service.intent_stats[field] for field in IntentStats.model_fields}),
+        reflection=ReflectionStats(**{field: chatbot_service.reflection_stats[field] for field in ReflectionStats.model_fields}),
+    )
+
 @router.patch("/update_email", response_model=AdminMessageResponse, status_code=status.HTTP_200_OK)
 async def update_admin_email(email_update: AdminEmailUpdateRequest, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
     """Update admin email."""
@@ -66,11 +103,12 @@ async def update_admin_password(password_update: AdminPasswordUpdateRequest, cur
     return AdminMessageResponse(message="Password updated successfully")
 
 @router.delete("/delete", response_model=AdminMessageResponse, status_code=status.HTTP_200_OK)
-async def delete_admin_account(current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
+async def delete_admin_account(background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
     """Delete admin account."""
     
     deleted = await admin_service.delete_admin(session, current_user)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin not found")
         
+    background_tasks.add_task(purge_service.purge_user_by_id, current_user.id)
     return AdminMessageResponse(message="Admin account deleted successfully")
@@ -1,16 +1,22 @@
-from typing import List
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile, status, Request
+from fastapi.responses import StreamingResponse
 from app.core.rate_limiter import limiter
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db.async_session import get_db
+from app.db.async_session import get_db, get_read_db
 from app.db.models.user import User, Role
 from app.core.security import get_current_user, RoleChecker
+from app.core.streaming import ndjson_stream, read_csv_rows
 from app.services.admin_service import admin_service
+from app.services.purge_service import purge_service
 from app.schemas.admin import (
     UserWithStats,
+    UserWithStatsPage,
     UserDetailResponse,
+    UserBookingsPage,
+    UserEventsPage,
     UserRoleUpdateAdmin,
     AdminMessageResponse
 )
@@ -18,41 +24,77 @@ from app.schemas.admin import (
 router = APIRouter()
 role_checker = RoleChecker([Role.ADMIN.value])
 
-@router.get("/attendees", response_model=List[UserWithStats], status_code=status.HTTP_200_OK)
+def _user_with_stats(row) -> UserWithStats:
+    return UserWithStats(
+        id=row.id, 
+        email=row.email, 
+        role=row.role, 
+        booking_count=row.booking_count, 
+        event_count=row.hosted_event_count
+    )
+
+def _page(rows, limit: int) -> UserWithStatsPage:
+    items = [_user_with_stats(row) for row in rows]
+    return UserWithStatsPage(items=items, next_cursor=items[-1].id if len(items) == limit else None)
+
+# The request session stays open until the stream finishes, which keeps the
+# server-side cursor alive while the response body is written.
+
+@router.get("/attendees", response_model=UserWithStatsPage, status_code=status.HTTP_200_OK)
 @limiter.limit("20/minute")
-async def list_attendees(request: Request, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
-    """List all users with role 'attendee' and their booking counts."""
-    results = await admin_service.list_attendees(session)
-    return [
-        UserWithStats(
-            id=u.id, 
-            email=u.email, 
-            role=u.role, 
-            booking_count=cnt, 
-            event_count=0
-        ) for u, cnt in results
-    ]
-
-@router.get("/organizers", response_model=List[UserWithStats], status_code=status.HTTP_200_OK)
+async def list_attendees(
+    request: Request,
+    cursor: Optional[UUID] = None,
+    limit: int = Query(50, ge=1, le=500),
+    email_prefix: Optional[str] = None,
+    min_bookings: Optional[int] = Query(None, ge=0),
+    max_bookings: Optional[int] = Query(None, ge=0),
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    current_user: User = Depends(get_current_user),
+    _: bool = Depends(role_checker),
+    session: AsyncSession = Depends(get_read_db)
+):
+    """
+    List users with role 'attendee' and their booking counts, a page at a time.
+    With format=ndjson, streams every matching attendee after `cursor` instead.
+    """
+    if response_format == "ndjson":
+        rows = admin_service.stream_attendees(session, cursor, email_prefix, min_bookings, max_bookings)
+        return StreamingResponse(ndjson_stream(rows, _user_with_stats), media_type="application/x-ndjson")
+
+    rows = await admin_service.list_attendees(session, cursor, limit, email_prefix, min_bookings, max_bookings)
+    return _page(rows, limit)
+
+@router.get("/organizers", response_model=UserWithStatsPage, status_code=status.HTTP_200_OK)
 @limiter.limit("20/minute")
-async def list_organizers(request: Request, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
-    """List all users with role 'organizer' and their hosted event counts."""
-    results = await admin_service.list_organizers(session)
-    return [
-        UserWithStats(
-            id=u.id, 
-            email=u.email, 
-            role=u.role, 
-            booking_count=0, 
-            event_count=cnt
-        ) for u, cnt in results
-    ]
+async def list_organizers(
+    request: Request,
+    cursor: Optional[UUID] = None,
+    limit: int = Query(50, ge=1, le=500),
+    email_prefix: Optional[str] = None,
+    min_events: Optional[int] = Query(None, ge=0),
+    max_events: Optional[int] = Query(None, ge=0),
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    current_user: User = Depends(get_current_user),
+    _: bool = Depends(role_checker),
+    session: AsyncSession = Depends(get_read_db)
+):
+    """
+    List users with role 'organizer' and their hosted event counts, a page at a time.
+    With format=ndjson, streams every matching organizer after `cursor` instead.
+    """
+    if response_format == "ndjson":
+        rows = admin_service.stream_organizers(session, cursor, email_prefix, min_events, max_events)
+        return StreamingResponse(ndjson_stream(rows, _user_with_stats), media_type="application/x-ndjson")
+
+    rows = await admin_service.list_organizers(session, cursor, limit, email_prefix, min_events, max_events)
+    return _page(rows, limit)
 
 @router.get("/details/{user_id}", response_model=UserDetailResponse, status_code=status.HTTP_200_OK)
 @limiter.limit("20/minute")
-async def get_user_details(request: Request, user_id: UUID, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
-    """Get full details of a specific user (bookings, events)."""
-    user, b_cnt, e_cnt, bookings, events = await admin_service.get_user_stats(session, user_id)
+async def get_user_details(request: Request, user_id: UUID, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_read_db)):
+    """Get details of a specific user with their latest bookings and events."""
+    user, (bookings, bookings_cursor), (events, events_cursor) = await admin_service.get_user_stats(session, user_id)
     
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -61,12 +103,42 @@ async def get_user_details(request: Request, user_id: UUID, current_user: User =
         id=user.id,
         email=user.email,
         role=user.role,
-        booking_count=b_cnt,
-        event_count=e_cnt,
+        booking_count=user.booking_count,
+        event_count=user.hosted_event_count,
         bookings=bookings,
-        events=events
+        events=events,
+        bookings_next_cursor=bookings_cursor,
+        events_next_cursor=events_cursor
     )
 
+@router.get("/details/{user_id}/bookings", response_model=UserBookingsPage, status_code=status.HTTP_200_OK)
+@limiter.limit("20/minute")
+async def get_user_bookings(request: Request, user_id: UUID, cursor: Optional[str] = None, limit: int = Query(20, ge=1, le=100), current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_read_db)):
+    """Page through a user's bookings, newest first, starting from a details or previous-page cursor."""
+    bookings, next_cursor = await admin_service.get_user_bookings_page(session, user_id, cursor, limit)
+    return UserBookingsPage(items=bookings, next_cursor=next_cursor)
+
+@router.get("/details/{user_id}/events", response_model=UserEventsPage, status_code=status.HTTP_200_OK)
+@limiter.limit("20/minute")
+async def get_user_events(request: Request, user_id: UUID, cursor: Optional[str] = None, limit: int = Query(20, ge=1, le=100), current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_read_db)):
+    """Page through a user's hosted events, latest first, starting from a details or previous-page cursor."""
+    events, next_cursor = await admin_service.get_user_events_page(session, user_id, cursor, limit)
+    return UserEventsPage(items=events, next_cursor=next_cursor)
+
+@router.post("/import", status_code=status.HTTP_200_OK)
+@limiter.limit("2/minute")
+async def import_users(request: Request, file: UploadFile = File(...), current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
+    """
+    Bulk-create users from a CSV upload with columns email, role (attendee or
+    organizer, default attendee) and either password or a pre-computed argon2
+    password_hash. Streams NDJSON: {line, errors} for each rejected or
+    already-registered row and {processed, imported, skipped, failed, done}
+    after every committed batch.
+    """
+    events = admin_service.import_users(session, read_csv_rows(file.file))
+    # One line per chunk so progress reaches the client as each batch commits
+    return StreamingResponse(ndjson_stream(events, lambda event: event, chunk_rows=1), media_type="application/x-ndjson")
+
 @router.patch("/role/{user_id}", response_model=AdminMessageResponse, status_code=status.HTTP_200_OK)
 @limiter.limit("10/minute")
 async def update_user_role(request: Request, user_id: UUID, role_update: UserRoleUpdateAdmin, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
@@ -83,7 +155,7 @@ async def update_user_role(request: Request, user_id: UUID, role_update: UserRol
 
 @router.delete("/{user_id}", response_model=AdminMessageResponse, status_code=status.HTTP_200_OK)
 @limiter.limit("10/minute")
-async def delete_user(request: Request, user_id: UUID, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
+async def delete_user(request: Request, user_id: UUID, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
     """Ban or delete a specific user account."""
     user = await admin_service.get_user_by_id(session, user_id)
     if not user:
@@ -93,4 +165,5 @@ async def delete_user(request: Request, user_id: UUID, current_user: User = Depe
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete your own account via user management")
 
     await admin_service.delete_admin(session, user)
+    background_tasks.add_task(purge_service.purge_user_by_id, user.id)
     return AdminMessageResponse(message="User account deleted successfully")
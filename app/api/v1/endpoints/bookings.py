@@ -1,18 +1,21 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.responses import StreamingResponse
 from app.core.rate_limiter import limiter
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db.async_session import get_db
+from app.db.async_session import get_db, get_read_db
 from app.db.models.user import User, Role
 from app.core.security import get_current_user, RoleChecker
+from app.core.streaming import csv_stream, ndjson_stream
 from app.services.booking_service import booking_service
 from app.services.event_service import event_service
 from app.schemas.booking import (
     BookingCreate,
     BookingRead,
-    BookingMessageResponse
+    BookingMessageResponse,
+    GuestListPage
 )
 from app.schemas.user import UserResponseBase
 
@@ -28,7 +31,7 @@ async def create_booking(request: Request, booking_data: BookingCreate, current_
     return BookingMessageResponse(message="Booking created successfully", booking=booking)
 
 @router.get("/my-bookings", response_model=List[BookingRead], status_code=status.HTTP_200_OK)
-async def get_my_bookings(current_user: User = Depends(get_current_user), _: bool = Depends(role_checker_attendee), session: AsyncSession = Depends(get_db)):
+async def get_my_bookings(current_user: User = Depends(get_current_user), _: bool = Depends(role_checker_attendee), session: AsyncSession = Depends(get_read_db)):
     """List all events currently booked by the logged-in user"""
     return await booking_service.get_user_bookings(session, current_user.id)
 
@@ -39,9 +42,12 @@ async def cancel_booking(request: Request, booking_id: UUID, current_user: User
     cancelled_booking = await booking_service.cancel_booking(session, booking_id, current_user)
     return BookingMessageResponse(message="Booking cancelled successfully", booking=cancelled_booking)
 
-@router.get("/{event_id}", response_model=List[UserResponseBase], status_code=status.HTTP_200_OK)
-async def get_event_attendees(event_id: UUID, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker_organizer), session: AsyncSession = Depends(get_db)):
-    """List all attendees for a specific event (Guest List)"""
+GUEST_COLUMNS = ["id", "email", "role"]
+
+def _guest(row) -> UserResponseBase:
+    return UserResponseBase(id=row.id, email=row.email, role=row.role)
+
+async def _check_guest_list_access(session: AsyncSession, event_id: UUID, current_user: User) -> None:
     event = await event_service.get_event_by_id(session, event_id)
     if not event:
          raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found")
@@ -49,5 +55,35 @@ async def get_event_attendees(event_id: UUID, current_user: User = Depends(get_c
     if current_user.role != Role.ADMIN.value and event.organizer_id != current_user.id:
          raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view guest list for this event")
 
+@router.get("/{event_id}", response_model=List[UserResponseBase], status_code=status.HTTP_200_OK)
+async def get_event_attendees(event_id: UUID, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker_organizer), session: AsyncSession = Depends(get_read_db)):
+    """List all attendees for a specific event (Guest List)"""
+    await _check_guest_list_access(session, event_id, current_user)
+
     attendees = await booking_service.get_event_attendees(session, event_id)
-    return [UserResponseBase(id=u.id, email=u.email, role=u.role) for u in attendees]
+    return [_guest(row) for row in attendees]
+
+@router.get("/{event_id}/page", response_model=GuestListPage, status_code=status.HTTP_200_OK)
+async def get_event_attendees_page(event_id: UUID, cursor: Optional[UUID] = None, limit: int = Query(100, ge=1, le=500), current_user: User = Depends(get_current_user), _: bool = Depends(role_checker_organizer), session: AsyncSession = Depends(get_read_db)):
+    """List attendees for a specific event (Guest List), a page at a time."""
+    await _check_guest_list_access(session, event_id, current_user)
+
+    attendees = await booking_service.get_event_attendees(session, event_id, cursor, limit)
+    items = [_guest(row) for row in attendees]
+    return GuestListPage(items=items, next_cursor=items[-1].id if len(items) == limit else None)
+
+@router.get("/{event_id}/export", status_code=status.HTTP_200_OK)
+@limiter.limit("5/minute")
+async def export_event_attendees(request: Request, event_id: UUID, response_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"), current_user: User = Depends(get_current_user), _: bool = Depends(role_checker_organizer), session: AsyncSession = Depends(get_read_db)):
+    """Export the full guest list as CSV or NDJSON, streamed straight from the database."""
+    await _check_guest_list_access(session, event_id, current_user)
+
+    # The request session stays open until the stream finishes
+    rows = booking_service.stream_event_attendees(session, event_id)
+    if response_format == "ndjson":
+        return StreamingResponse(ndjson_stream(rows, _guest), media_type="application/x-ndjson")
+    return StreamingResponse(
+        csv_stream(rows, _guest, GUEST_COLUMNS),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="guest-list-{event_id}.csv"'}
+    )
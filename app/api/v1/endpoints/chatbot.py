@@ -1,22 +1,32 @@
+from typing import AsyncIterator
 from fastapi import APIRouter, Depends, status
-from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.db.async_session import get_db
+from app.core.config import settings
 from app.core.security import get_current_user
+from app.core.streaming import EventSourceResponse, sse_stream
 from app.db.models.user import User, Role
-from app.schemas.chatbot import ChatRequest, ChatResponse
+from app.schemas.chatbot import ChatRequest, ChatResponse, ChatEvent, ChatDone
 from app.services.chatbot_service import chatbot_service
 from app.core.security import RoleChecker
 
 router = APIRouter()
 rolechecker = RoleChecker([Role.ORGANIZER.value, Role.ATTENDEE.value])
+
+async def _chat_events(query: str, user: User, session: AsyncSession) -> AsyncIterator[ChatEvent]:
+    async for event in chatbot_service.process_query(query, user, session):
+        yield event
+    yield ChatDone()
     
-@router.post("/", response_class=StreamingResponse, status_code=status.HTTP_200_OK)
+@router.post("/", response_class=EventSourceResponse, status_code=status.HTTP_200_OK)
 async def chat(request: ChatRequest, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_db), _: bool = Depends(rolechecker)):
     """
     Interact with the GenAI Chatbot via Server-Sent Events (SSE) streaming.
+    Sends `token` events with the reply text, `tool-start` / `tool-end` around
+    each tool call and `done` at the end; comment lines keep an idle
+    connection open. Disconnecting stops the reply, including LLM and tool
+    calls in flight.
     """
-    return StreamingResponse(
-        chatbot_service.process_query(request.query, current_user, session), 
-        media_type="text/event-stream"
+    return EventSourceResponse(
+        sse_stream(_chat_events(request.query, current_user, session), settings.CHAT_SSE_HEARTBEAT_SECONDS)
     )
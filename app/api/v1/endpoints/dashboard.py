@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db.async_session import get_db
@@ -6,6 +6,7 @@ from app.core.security import get_current_user
 from app.db.models.user import User
 
 from app.services.user_service import user_service
+from app.services.purge_service import purge_service
 from app.schemas.user import (
     UserResponseBase,
     UserMessageResponse,
@@ -93,12 +94,11 @@ async def update_user_role(role_update: UserRoleUpdateRequest, current_user: Use
     return UserMessageResponse(message="Role updated successfully")
 
 @router.delete("/delete", response_model=UserMessageResponse, status_code=status.HTTP_200_OK)
-async def delete_user_account(current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_db)):
+async def delete_user_account(background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_db)):
     """Delete current user account."""
     
-    # We might want to remove this or make it logically soft delete later
-    # For now, it physically deletes.
-    await session.delete(current_user)
-    await session.commit()
+    # Soft delete now; events and bookings are purged in batches after the response
+    await user_service.delete_user(session, current_user)
+    background_tasks.add_task(purge_service.purge_user_by_id, current_user.id)
     
     return UserMessageResponse(message="User account deleted successfully")
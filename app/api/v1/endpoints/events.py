@@ -1,33 +1,37 @@
+import csv
 from typing import List, Optional
 from fastapi import Query
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, status, Request
 from app.core.rate_limiter import limiter
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db.async_session import get_db
+from app.db.async_session import get_db, get_read_db
 from app.db.models.user import User, Role
 from app.core.security import get_current_user, RoleChecker
+from app.core.streaming import read_csv_rows, read_ndjson_rows
 from app.services.event_service import event_service
+from app.services.purge_service import purge_service
 from app.schemas.event import (
     EventCreateRequest,
     EventUpdateRequest,
     EventResponseBase,
     EventCreateResponse,
     EventUpdateResponse,
-    EventMessageResponse
+    EventMessageResponse,
+    EventImportResponse
 )
 
 router = APIRouter()
 role_checker = RoleChecker([Role.ORGANIZER.value, Role.ADMIN.value])
 
 @router.get("/", response_model=List[EventResponseBase], status_code=status.HTTP_200_OK)
-async def list_events(session: AsyncSession = Depends(get_db), skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100), upcoming_only: bool = True):
+async def list_events(session: AsyncSession = Depends(get_read_db), skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100), upcoming_only: bool = True):
     """List all events (Public). Defaults to upcoming only. Supports pagination."""
     return await event_service.get_all_events(session, skip, limit, upcoming_only)
 
 @router.get("/{event_id}", response_model=EventResponseBase, status_code=status.HTTP_200_OK)
-async def get_event(event_id: UUID, session: AsyncSession = Depends(get_db)):
+async def get_event(event_id: UUID, session: AsyncSession = Depends(get_read_db)):
     """Get specific event details (Public)."""
     event = await event_service.get_event_by_id(session, event_id)
     if not event:
@@ -46,6 +50,38 @@ async def create_event(request: Request, event_data: EventCreateRequest, current
         event=new_event
     )
 
+def _upload_format(file: UploadFile) -> Optional[str]:
+    name = (file.filename or "").lower()
+    if name.endswith(".csv") or file.content_type == "text/csv":
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or file.content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+@router.post("/import", response_model=EventImportResponse, status_code=status.HTTP_200_OK)
+@limiter.limit("2/minute")
+async def import_events(request: Request, file: UploadFile = File(...), file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"), current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
+    """
+    Bulk-create events from a CSV or NDJSON upload (Organizer or Admin only).
+    Each row carries the create fields: title, description, date, location, capacity.
+    Valid rows are imported; invalid and duplicate rows are reported by line number.
+    """
+    file_format = file_format or _upload_format(file)
+    if not file_format:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown file type; pass format=csv or format=ndjson")
+
+    rows = read_csv_rows(file.file) if file_format == "csv" else read_ndjson_rows(file.file)
+    try:
+        imported, errors = await event_service.import_events(session, rows, current_user)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not read file: {e}")
+
+    return EventImportResponse(
+        message=f"Imported {imported} events",
+        imported=imported,
+        errors=errors
+    )
+
 @router.patch("/{event_id}", response_model=EventUpdateResponse, status_code=status.HTTP_200_OK)
 @limiter.limit("10/minute")
 async def update_event(request: Request, event_id: UUID, update_data: EventUpdateRequest, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
@@ -67,7 +103,7 @@ async def update_event(request: Request, event_id: UUID, update_data: EventUpdat
 
 @router.delete("/{event_id}", response_model=EventMessageResponse, status_code=status.HTTP_200_OK)
 @limiter.limit("5/minute")
-async def delete_event(request: Request, event_id: UUID, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
+async def delete_event(request: Request, event_id: UUID, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), _: bool = Depends(role_checker), session: AsyncSession = Depends(get_db)):
     """Delete event (Owner or Admin only)."""
     
     event = await event_service.get_event_by_id(session, event_id)
@@ -78,5 +114,6 @@ async def delete_event(request: Request, event_id: UUID, current_user: User = De
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to delete this event")
         
     await event_service.delete_event(session, event)
+    background_tasks.add_task(purge_service.purge_event_by_id, event.id)
     
     return EventMessageResponse(message="Event deleted successfully")
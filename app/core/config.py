@@ -7,17 +7,78 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Rows fetched per round trip when streaming exports through a server-side cursor
+    DB_STREAM_BATCH_SIZE: int = 1000
+    
+    # Optional asyncpg DSN of a streaming replica for read-only endpoints
+    DB_REPLICA_URI: str | None = None
+    # How long a user's reads stay on the primary after they write
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+    
     JWT_SECRET: str
     JWT_ALGORITHM: str
     JWT_EXPIRY: int
     
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 2.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    
+    # Share of a rate limit each worker may lease from Redis and spend locally
+    RATE_LIMIT_LOCAL_FRACTION: float = 0.1
+    # Number of reverse proxies in front of the app whose X-Forwarded-For entries are trusted
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
     
     ACCESS_TOKEN_EXPIRY: int 
     REFRESH_TOKEN_EXPIRY: int
     
     GROQ_API_KEY: str | None = None
+    # Chatbot conversations are kept in Redis: messages per user, and idle time before they expire
+    CHAT_HISTORY_MAX_MESSAGES: int = 20
+    CHAT_HISTORY_TTL_SECONDS: int = 86400
+    # Minimum rapidfuzz ratio (0-100) for a message to skip the agent and be answered from a template
+    CHAT_FAST_PATH_THRESHOLD: float = 90.0
+    # Per-worker cache of answers to read-only event questions. Seat counts in a
+    # cached answer can be up to the TTL old; event changes invalidate at once.
+    CHAT_CACHE_MAX_ENTRIES: int = 1000
+    CHAT_CACHE_TTL_SECONDS: int = 300
+    # Share of answers that skip reflection (successful reads) graded in the
+    # background instead, to keep an eye on their quality
+    CHAT_REFLECTION_SAMPLE_RATE: float = 0.05
+    # Seconds a chat stream may stay silent before a keep-alive comment is sent
+    CHAT_SSE_HEARTBEAT_SECONDS: float = 15.0
+    # Decomposed sub-queries of one user answered concurrently, per worker
+    CHAT_MAX_CONCURRENT_SUBQUERIES: int = 3
+    # Local intent matches (rapidfuzz WRatio, 0-100) accepted without asking the LLM:
+    # best example score, and its lead over the best example of any other label
+    INTENT_LOCAL_THRESHOLD: float = 88.0
+    INTENT_LOCAL_MARGIN: float = 8.0
+    # Share of local matches also sent to the LLM to measure agreement
+    INTENT_AGREEMENT_SAMPLE_RATE: float = 0.05
+    
+    # Largest CSV/NDJSON upload accepted by POST /events/import, in rows
+    EVENT_IMPORT_MAX_ROWS: int = 10000
+    
+    # Rows hashed, staged and inserted per transaction by POST /admin/users/import
+    USER_IMPORT_BATCH_SIZE: int = 5000
+    # Processes hashing imported passwords; defaults to one per CPU
+    PASSWORD_HASH_WORKERS: int | None = None
+    
+    # Hot/cold archival of past events and old cancelled bookings
+    ARCHIVE_EVENTS_AFTER_DAYS: int = 30
+    ARCHIVE_CANCELLED_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    
+    # Rows removed per transaction when purging soft-deleted users and events
+    PURGE_BATCH_SIZE: int = 500
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
     
@@ -1,4 +1,222 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import time, math, logging
+from redis.exceptions import NoScriptError
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from app.core.config import settings
+from app.core.redis import redis_client, RedisBatch
+from app.core.utils import get_bearer_user_id
 
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
+
+# GCRA (generic cell rate algorithm) evaluated atomically inside Redis.
+# Only the "theoretical arrival time" is stored per key, so every worker and
+# replica shares one budget and the state costs a single small string.
+# KEYS[1] = bucket key
+# KEYS[2] = optional guard key (a revoked token's blocklist entry): if it
+#           exists nothing is taken, so a rejected request spends no budget
+# ARGV[1] = emission interval in ms (period / limit)
+# ARGV[2] = burst tolerance in ms (period)
+# ARGV[3] = number of tokens to take
+# Returns {allowed (0/1), retry_after_ms}, or {-1, 0} when the guard key exists
+GCRA_SCRIPT = """
+if KEYS[2] and redis.call('EXISTS', KEYS[2]) == 1 then
+    return {-1, 0}
+end
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local quantity = tonumber(ARGV[3])
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission * quantity
+local allow_at = new_tat - tolerance
+if allow_at > now then
+    return {0, allow_at - now}
+end
+
+redis.call('SET', KEYS[1], new_tat, 'PX', math.max(1, new_tat - now))
+return {1, 0}
+"""
+
+# Seconds between sweeps of expired local leases
+LOCAL_SWEEP_SECONDS = 60
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse a rate string such as "5/minute" into (limit, period_seconds)."""
+    amount, _, unit = rate.partition("/")
+    unit = unit.strip().lower().rstrip("s")
+    if unit not in PERIODS:
+        raise ValueError(f"Unsupported rate limit period: {rate}")
+    return int(amount), PERIODS[unit]
+
+def get_remote_address(request: Request) -> str:
+    """Client IP, honouring X-Forwarded-For only for the configured number of trusted proxy hops."""
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = request.headers.get("x-forwarded-for")
+    if hops > 0 and forwarded:
+        chain = [ip.strip() for ip in forwarded.split(",") if ip.strip()]
+        if chain:
+            return chain[-min(hops, len(chain))]
+    return request.client.host if request.client else "unknown"
+
+def get_rate_limit_key(request: Request) -> str:
+    """Key requests by authenticated user when a valid access token is present, otherwise by IP."""
+    user_id = get_bearer_user_id(request.headers.get("authorization"))
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{get_remote_address(request)}"
+
+class RateLimiter:
+    def __init__(self, key_func: Callable[[Request], str] = get_rate_limit_key, prefix: str = "ratelimit"):
+        self.key_func = key_func
+        self.prefix = prefix
+        self.script = redis_client.register_script(GCRA_SCRIPT)
+        # Tokens leased from Redis and held by this worker: key -> (tokens, expires_at)
+        self._local: Dict[str, Tuple[int, float]] = {}
+        self._next_sweep = 0.0
+
+    def _sweep(self) -> None:
+        """Drop expired leases, so the map holds only recently active clients."""
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + LOCAL_SWEEP_SECONDS
+        self._local = {key: lease for key, lease in self._local.items() if lease[1] > now}
+
+    def _take_local(self, key: str) -> bool:
+        tokens, expires_at = self._local.get(key, (0, 0.0))
+        if tokens <= 0 or expires_at <= time.monotonic():
+            self._local.pop(key, None)
+            return False
+        self._local[key] = (tokens - 1, expires_at)
+        return True
+
+    def _lease_size(self, limit: int) -> int:
+        return max(1, int(limit * settings.RATE_LIMIT_LOCAL_FRACTION))
+
+    async def load_script(self) -> None:
+        """
+        Load the GCRA script into Redis once at startup. Batched checks are
+        queued as plain EVALSHA: a Script object queued on a pipeline would
+        make every execute() check for it in an extra round trip first.
+        """
+        try:
+            await redis_client.script_load(GCRA_SCRIPT)
+        except Exception as e:
+            # hit() loads it on first NOSCRIPT instead
+            logger.warning("Could not load rate limit script: %s", e)
+
+    def _args(self, limit: int, period: int, lease: int) -> list:
+        return [int(period * 1000 / limit), period * 1000, lease]
+
+    def _queue(self, batch: RedisBatch, key: str, limit: int, period: int, guard: Optional[str] = None) -> str:
+        name = f"{self.prefix}:{key}"
+        keys = [name, guard] if guard else [name]
+        args = self._args(limit, period, self._lease_size(limit))
+        batch.add(name, lambda pipe: pipe.evalsha(self.script.sha, len(keys), *keys, *args))
+        return name
+
+    def prefetch(self, request: Request, batch: RedisBatch, guard: Optional[str] = None) -> None:
+        """
+        Queue the rate-limit check for the matched endpoint on the request's batch,
+        so it shares a round trip with the other lookups made during auth. No
+        budget is taken if the guard key (a revoked token's blocklist entry)
+        exists, since that request is rejected anyway.
+        """
+        rule = getattr(request.scope.get("endpoint"), "rate_limit", None)
+        if rule is None:
+            return
+        scope, limit, period, key_func = rule
+        key = f"{scope}:{key_func(request)}"
+        tokens, expires_at = self._local.get(key, (0, 0.0))
+        if tokens > 0 and expires_at > time.monotonic():
+            return
+        self._queue(batch, key, limit, period, guard)
+
+    async def hit(self, key: str, limit: int, period: int, batch: Optional[RedisBatch] = None) -> Tuple[bool, int]:
+        """
+        Consume one token for key. Returns (allowed, retry_after_seconds).
+        Most allowed requests are served from a small local lease; Redis is
+        only contacted to lease a new batch of tokens from the shared budget.
+        """
+        name = f"{self.prefix}:{key}"
+        self._sweep()
+        if (batch is None or not batch.has(name)) and self._take_local(key):
+            return True, 0
+
+        batch = batch or RedisBatch()
+        self._queue(batch, key, limit, period)
+        lease = self._lease_size(limit)
+
+        try:
+            try:
+                allowed, retry_ms = await batch.get(name)
+            except NoScriptError:
+                # Redis restarted or flushed its script cache; Script reloads it
+                allowed, retry_ms = await self.script(keys=[name], args=self._args(limit, period, lease))
+            if allowed == -1:
+                # Prefetched behind a guard key that has since been deleted
+                allowed, retry_ms = await self.script(keys=[name], args=self._args(limit, period, lease))
+            if not allowed and lease > 1:
+                lease = 1
+                allowed, retry_ms = await self.script(keys=[name], args=self._args(limit, period, lease))
+        except Exception as e:
+            # Fail open: a Redis outage must not take the whole API down
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            return True, 0
+
+        if not allowed:
+            return False, max(1, math.ceil(int(retry_ms) / 1000))
+
+        if lease > 1:
+            # Leased tokens expire once they would have been replenished anyway,
+            # which bounds how far a worker can run ahead of the shared budget.
+            self._local[key] = (lease - 1, time.monotonic() + period * lease / limit)
+        return True, 0
+
+    def limit(self, rate: str, key_func: Optional[Callable[[Request], str]] = None):
+        """Decorator for endpoints that take a `request: Request` argument."""
+        limit, period = parse_rate(rate)
+        key_func = key_func or self.key_func
+
+        def decorator(func):
+            scope = f"{func.__module__}.{func.__name__}"
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                if not isinstance(request, Request):
+                    request = next((a for a in args if isinstance(a, Request)), None)
+                if request is None:
+                    raise RuntimeError(f"{scope} must accept a 'request: Request' argument to be rate limited")
+
+                batch = getattr(request.state, "redis_batch", None)
+                allowed, retry_after = await self.hit(f"{scope}:{key_func(request)}", limit, period, batch)
+                if not allowed:
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail=f"Rate limit exceeded: {rate}",
+                        headers={"Retry-After": str(retry_after)}
+                    )
+                return await func(*args, **kwargs)
+
+            wrapper.rate_limit = (scope, limit, period, key_func)
+            return wrapper
+
+        return decorator
+
+limiter = RateLimiter()
@@ -1,13 +1,91 @@
+import logging
 import redis.asyncio as redis
+from typing import Any, Callable, Dict
+from fastapi import Request
 from app.core.config import settings
 
-token_blocklist = redis.StrictRedis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0)
+redis_pool = redis.BlockingConnectionPool(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=0,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    health_check_interval=30,
+)
+
+redis_client = redis.StrictRedis(connection_pool=redis_pool)
+token_blocklist = redis_client
+
+class RedisBatch:
+    """
+    Request-scoped collector for independent Redis lookups.
+    Commands are queued by name and sent together in one pipeline round trip
+    the first time any of their results is needed.
+    """
+    def __init__(self, client: redis.StrictRedis = redis_client):
+        self.client = client
+        self._pending: Dict[str, Callable[[Any], Any]] = {}
+        self._results: Dict[str, Any] = {}
+
+    def has(self, name: str) -> bool:
+        return name in self._pending or name in self._results
+
+    def add(self, name: str, command: Callable[[Any], Any]) -> None:
+        """Queue `command(pipeline)` under name. Ignored if name is already queued or resolved."""
+        if not self.has(name):
+            self._pending[name] = command
+
+    async def execute(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        async with self.client.pipeline(transaction=False) as pipe:
+            for command in pending.values():
+                command(pipe)
+            results = await pipe.execute(raise_on_error=False)
+        self._results.update(zip(pending, results))
+
+    async def get(self, name: str) -> Any:
+        if name in self._pending:
+            await self.execute()
+        result = self._results[name]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+def get_redis_batch(request: Request) -> RedisBatch:
+    batch = getattr(request.state, "redis_batch", None)
+    if batch is None:
+        batch = RedisBatch()
+        request.state.redis_batch = batch
+    return batch
 
 async def add_jti_to_blocklist(jti: str) -> None:
     await token_blocklist.set(name=jti, value="", ex=settings.JWT_EXPIRY)
 
 
-async def token_in_blocklist(jti:str) -> bool:
-   jti =  await token_blocklist.get(jti)
+async def token_in_blocklist(jti: str, batch: RedisBatch | None = None) -> bool:
+    batch = batch or RedisBatch()
+    batch.add(f"blocklist:{jti}", lambda pipe: pipe.exists(jti))
+    return bool(await batch.get(f"blocklist:{jti}"))
+
+
+# Bumped whenever events are created, changed or deleted, and whenever a
+# booking or cancellation moves their seat counts; caches of
+# event-derived data include it in their keys so stale entries stop matching.
+EVENTS_VERSION_KEY = "data-version:events"
+
+async def bump_events_version() -> None:
+    try:
+        await redis_client.incr(EVENTS_VERSION_KEY)
+    except Exception as e:
+        logging.warning("Could not bump events version: %s", e)
 
-   return jti is not None
\ No newline at end of file
+async def get_events_version() -> int | None:
+    """Current events version, or None if Redis is unavailable (callers should not cache)."""
+    try:
+        return int(await redis_client.get(EVENTS_VERSION_KEY) or 0)
+    except Exception:
+        return None
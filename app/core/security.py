@@ -2,11 +2,12 @@ from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 from app.core.utils import decode_token
 from app.db.models.user import User
-from app.db.async_session import get_db
+from app.db.async_session import get_db, release_connection
 from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Any, Dict
 from fastapi import HTTPException, Request, status, Depends
-from app.core.redis import token_in_blocklist
+from app.core.redis import token_in_blocklist, get_redis_batch
+from app.core.rate_limiter import limiter
 
 class TokenBearer(HTTPBearer):
     def __init__(self, auto_error=True):
@@ -26,8 +27,11 @@ class TokenBearer(HTTPBearer):
                 }
             )
 
-        # Check if token is revoked
-        if await token_in_blocklist(token_data['jti']):
+        # Check if token is revoked. The endpoint's rate-limit check rides along
+        # in the same pipeline so the request pays a single Redis round trip.
+        batch = get_redis_batch(request)
+        limiter.prefetch(request, batch, guard=token_data['jti'])
+        if await token_in_blocklist(token_data['jti'], batch):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
                 detail={
@@ -69,11 +73,16 @@ refresh_token_bearer = RefreshTokenBearer()
 
 async def get_current_user(token_details: Dict = Depends(access_token_bearer), session: AsyncSession = Depends(get_db)) -> User:
     user = await session.get(User, token_details["user"]["id"])
-    if not user:
+    if not user or user.deleted_at is not None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+    # Lets the session pin this user to the primary when it commits a write
+    session.info["user_id"] = str(user.id)
+    # Hand the connection back before role checks and the endpoint run;
+    # requests rejected by RoleChecker then never hold one
+    await release_connection(session)
     return user
 
 class RoleChecker:
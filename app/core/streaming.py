@@ -0,0 +1,129 @@
+import asyncio, csv, io, json
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, List, Tuple, Union
+from pydantic import BaseModel
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Rows per chunk handed to the server: few enough to keep memory flat,
+# enough to avoid a socket write per row
+CHUNK_ROWS = 500
+
+async def ndjson_stream(rows: AsyncIterator, serialize: Callable[..., BaseModel], chunk_rows: int = CHUNK_ROWS) -> AsyncIterator[str]:
+    """Encode rows as newline-delimited JSON while they are still being fetched."""
+    chunk = []
+    async for row in rows:
+        chunk.append(serialize(row).model_dump_json())
+        if len(chunk) >= chunk_rows:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+async def csv_stream(rows: AsyncIterator, serialize: Callable[..., BaseModel], columns: List[str]) -> AsyncIterator[str]:
+    """Encode rows as CSV with a header line while they are still being fetched."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    async for row in rows:
+        data = serialize(row).model_dump(mode="json")
+        writer.writerow([data[column] for column in columns])
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+async def sse_stream(events: AsyncIterator[BaseModel], heartbeat_seconds: float) -> AsyncIterator[str]:
+    """
+    Frame models as server-sent events, each sent as the SSE type in its
+    event class attribute with the model as JSON data. A comment line goes
+    out whenever nothing else has for heartbeat_seconds, so proxies keep an
+    idle connection open and a client that left is noticed.
+    """
+    iterator = aiter(events)
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat_seconds)
+            if not done:
+                yield ": ping\n\n"
+                continue
+            pending = None
+            try:
+                event = done.pop().result()
+            except StopAsyncIteration:
+                return
+            yield f"event: {event.event}\ndata: {event.model_dump_json()}\n\n"
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await iterator.aclose()
+
+class EventSourceResponse(StreamingResponse):
+    """
+    A text/event-stream that stops producing as soon as the client goes away.
+    It listens for the disconnect itself (servers on ASGI 2.4 only report it
+    when a send fails) and then cancels the stream, which cancels whatever
+    the body iterator was awaiting.
+    """
+    media_type = "text/event-stream"
+
+    def __init__(self, content: AsyncIterator[str], **kwargs):
+        super().__init__(content, **kwargs)
+        # Stop nginx and similar proxies from buffering events
+        self.headers.setdefault("Cache-Control", "no-cache")
+        self.headers.setdefault("X-Accel-Buffering", "no")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stream = asyncio.create_task(self.stream_response(send))
+        disconnect = asyncio.create_task(self.listen_for_disconnect(receive))
+        try:
+            await asyncio.wait({stream, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stream.cancel()
+            disconnect.cancel()
+            await asyncio.gather(stream, disconnect, return_exceptions=True)
+            await self.body_iterator.aclose()
+        error = None if stream.cancelled() else stream.exception()
+        # A send failing because the client left is not an error
+        if error is not None and not isinstance(error, OSError):
+            raise error
+
+# Uploads are parsed row by row; each row is (line number, dict) or
+# (line number, error message) so callers can report bad lines and carry on.
+
+def read_csv_rows(file: BinaryIO) -> Iterator[Tuple[int, Union[dict, str]]]:
+    text_file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text_file)
+        for row in reader:
+            # DictReader files cells past the header under None, where the
+            # row schemas would drop them silently
+            if None in row:
+                yield reader.line_num, f"Expected {len(reader.fieldnames)} columns, got {len(reader.fieldnames) + len(row[None])}"
+                continue
+            yield reader.line_num, row
+    finally:
+        # Leave the upload's file open for its owner to close; an abandoned
+        # generator may be finalised after the owner already has
+        if not text_file.closed:
+            text_file.detach()
+
+def read_ndjson_rows(file: BinaryIO) -> Iterator[Tuple[int, Union[dict, str]]]:
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_number, "Invalid JSON"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, data
@@ -1,4 +1,4 @@
-import jwt, uuid, logging
+import jwt, uuid, logging, base64, os
 from app.core.config import settings
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
@@ -36,6 +36,27 @@ def decode_token(token: str) -> dict:
         logging.exception(e)
         return None
 
+def get_bearer_user_id(authorization: str | None) -> str | None:
+    """User id from an `Authorization: Bearer <access token>` header, if the token is valid."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    token_data = decode_token(authorization[7:].strip())
+    if not token_data or token_data.get("refresh"):
+        return None
+    return token_data.get("user", {}).get("id")
+
+def encode_cursor(sort_value: datetime, row_id: uuid.UUID) -> str:
+    """Opaque keyset cursor from the sort key of the last row on a page."""
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID] | None:
+    try:
+        sort_value, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(sort_value), uuid.UUID(row_id)
+    except ValueError:
+        return None
+
 passwd_context = CryptContext(
     schemes=['argon2'],
     deprecated="auto"
@@ -43,9 +64,39 @@ passwd_context = CryptContext(
 
 
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
 
 async def generate_password_hash(password: str) -> str:
     return await asyncio.to_thread(passwd_context.hash, password)
 
+# Bulk imports hash thousands of passwords at a time; argon2 is CPU-bound by
+# design, so those go to worker processes rather than the default thread pool.
+_hash_pool: ProcessPoolExecutor | None = None
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    return [passwd_context.hash(password) for password in passwords]
+
+async def generate_password_hashes(passwords: list[str]) -> list[str]:
+    """Hash a batch of passwords across the process pool, keeping their order."""
+    global _hash_pool
+    if not passwords:
+        return []
+    workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=workers)
+    loop = asyncio.get_running_loop()
+    # One chunk per worker keeps IPC to a round trip per process
+    size = -(-len(passwords) // workers)
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    hashed = await asyncio.gather(*(loop.run_in_executor(_hash_pool, hash_passwords, chunk) for chunk in chunks))
+    return [password_hash for chunk in hashed for password_hash in chunk]
+
+def shutdown_hash_pool() -> None:
+    """Stop the hashing workers; called when the app shuts down."""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
 async def verify_password(password: str, hash: str) -> bool:
     return await asyncio.to_thread(passwd_context.verify, password, hash)
\ No newline at end of file
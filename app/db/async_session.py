@@ -1,12 +1,139 @@
+import logging
+from typing import AsyncIterator
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.redis import redis_client, get_redis_batch
+from app.core.utils import get_bearer_user_id
+from app.db.pool_metrics import InstrumentedQueuePool
 
-engine = create_async_engine(settings.async_db_uri, echo=True, future=True)
+def build_engine(uri: str, name: str):
+    return create_async_engine(
+        uri,
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # Set to 0 when running behind PgBouncer in transaction mode
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
 
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+class TrackedSession(Session):
+    """Sync session behind AsyncSession that remembers whether it wrote anything."""
+
+def mark_written(session) -> None:
+    """For writes the ORM does not see (COPY, raw DML through the driver)."""
+    session.info["txn_wrote"] = True
+
+@event.listens_for(TrackedSession, "after_flush")
+def _mark_flush_write(session, flush_context):
+    mark_written(session)
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _mark_statement_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_written(orm_execute_state.session)
+
+@event.listens_for(TrackedSession, "after_commit")
+def _note_committed_write(session):
+    # Redis cannot be awaited from this sync hook; TrackedAsyncSession.commit pins
+    if session.info.pop("txn_wrote", None):
+        session.info["pin_pending"] = True
+
+@event.listens_for(TrackedSession, "after_rollback")
+def _clear_transaction_write(session):
+    session.info.pop("txn_wrote", None)
+
+class TrackedAsyncSession(AsyncSession):
+    async def commit(self) -> None:
+        """
+        Commit, then pin the session's user to the primary if the transaction
+        wrote. Pinning here rather than in get_db's teardown (which runs after
+        the response is sent) means the pin is in place before the client
+        can read.
+        """
+        await super().commit()
+        if self.info.pop("pin_pending", None):
+            await _pin_session_user(self)
+
+engine = build_engine(settings.async_db_uri, "primary")
+replica_engine = build_engine(settings.DB_REPLICA_URI, "replica") if settings.DB_REPLICA_URI else engine
+
+async_session = sessionmaker(engine, class_=TrackedAsyncSession, sync_session_class=TrackedSession, expire_on_commit=False)
+replica_session = sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False) if replica_engine is not engine else async_session
+
+async def release_connection(session: AsyncSession) -> None:
+    """
+    End a read-only transaction so its connection goes back to the pool.
+    Sessions check out a connection lazily on their first query, so the next
+    query just checks one out again. Does nothing while the transaction holds
+    writes; callers must not use it between a FOR UPDATE read and its write.
+    """
+    if not session.in_transaction():
+        return
+    if session.new or session.dirty or session.deleted or session.info.get("txn_wrote"):
+        return
+    # expire_on_commit=False keeps loaded objects usable after the commit
+    await session.commit()
+
+async def stream_rows(session: AsyncSession, statement) -> AsyncIterator:
+    """
+    Yield result rows from a server-side cursor, DB_STREAM_BATCH_SIZE at a time.
+    The session (and its connection) stays busy until the iterator is exhausted.
+    """
+    result = await session.stream(statement.execution_options(yield_per=settings.DB_STREAM_BATCH_SIZE))
+    async for row in result:
+        yield row
+
+def _pin_key(user_id: str) -> str:
+    return f"primary-pin:{user_id}"
+
+async def pin_to_primary(user_id: str) -> None:
+    """Route the user's reads to the primary for a short window after they write."""
+    await redis_client.set(_pin_key(user_id), "", ex=settings.DB_READ_YOUR_WRITES_SECONDS)
+
+async def _pin_session_user(session: AsyncSession) -> None:
+    # get_current_user records who owns the session
+    user_id = session.info.get("user_id")
+    if not user_id or replica_session is async_session:
+        return
+    try:
+        await pin_to_primary(user_id)
+    except Exception as e:
+        logging.warning("Could not pin user %s to primary: %s", user_id, e)
 
 async def get_db() -> AsyncSession:
     async with async_session() as session:
         yield session
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Session for read-only endpoints. Uses the replica pool when one is configured,
+    unless the caller wrote recently and is pinned to the primary.
+    """
+    factory = replica_session
+    if replica_session is not async_session:
+        user_id = get_bearer_user_id(request.headers.get("authorization"))
+        if user_id:
+            batch = get_redis_batch(request)
+            batch.add(_pin_key(user_id), lambda pipe: pipe.exists(_pin_key(user_id)))
+            try:
+                if await batch.get(_pin_key(user_id)):
+                    factory = async_session
+            except Exception:
+                factory = async_session
+
+    async with factory() as session:
+        yield session
@@ -0,0 +1,82 @@
+"""
+Reconciliation check for the denormalised per-user counters.
+
+user.booking_count and user.hosted_event_count are kept current by triggers
+on booking, booking_archive, event and event_archive. This recounts them from
+the source tables and reports (or repairs) any user whose stored value drifted,
+e.g. after manual SQL with triggers disabled or a race with the backfill.
+
+Usage:
+    uv run python -m app.db.counters          # report drift, exit 1 if any
+    uv run python -m app.db.counters --fix    # report and repair
+"""
+import sys, asyncio
+from typing import List
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+DRIFT = text("""
+WITH bookings AS (
+    SELECT user_id, count(*) AS n FROM (
+        SELECT user_id FROM booking
+        UNION ALL
+        SELECT user_id FROM booking_archive
+    ) b GROUP BY user_id
+), events AS (
+    SELECT organizer_id, count(*) AS n FROM (
+        SELECT organizer_id FROM event
+        UNION ALL
+        SELECT organizer_id FROM event_archive
+    ) e GROUP BY organizer_id
+)
+SELECT u.id, u.booking_count, coalesce(b.n, 0) AS actual_bookings,
+       u.hosted_event_count, coalesce(e.n, 0) AS actual_events
+FROM "user" u
+LEFT JOIN bookings b ON b.user_id = u.id
+LEFT JOIN events e ON e.organizer_id = u.id
+WHERE u.booking_count <> coalesce(b.n, 0) OR u.hosted_event_count <> coalesce(e.n, 0)
+""")
+
+# Taking the row lock in its own statement first means the recount below sees
+# every write whose trigger got to the row before us; writes queued behind the
+# lock apply their +1/-1 on top of the corrected value.
+LOCK_USER = text('SELECT id FROM "user" WHERE id = :user_id FOR UPDATE')
+
+RECOUNT_USER = text("""
+UPDATE "user" SET
+    booking_count = (SELECT count(*) FROM booking WHERE user_id = :user_id)
+                  + (SELECT count(*) FROM booking_archive WHERE user_id = :user_id),
+    hosted_event_count = (SELECT count(*) FROM event WHERE organizer_id = :user_id)
+                       + (SELECT count(*) FROM event_archive WHERE organizer_id = :user_id)
+WHERE id = :user_id
+""")
+
+async def find_drift(session: AsyncSession) -> List:
+    """Returns (id, booking_count, actual_bookings, hosted_event_count, actual_events) per drifted user."""
+    result = await session.execute(DRIFT)
+    return result.all()
+
+async def fix_drift(session: AsyncSession, user_ids: List) -> None:
+    """Recount the given users, one short transaction each."""
+    for user_id in user_ids:
+        await session.execute(LOCK_USER, {"user_id": user_id})
+        await session.execute(RECOUNT_USER, {"user_id": user_id})
+        await session.commit()
+
+async def main(fix: bool) -> int:
+    from app.db.async_session import async_session
+    async with async_session() as session:
+        drifted = await find_drift(session)
+        for row in drifted:
+            print(f"user {row.id}: booking_count {row.booking_count} != {row.actual_bookings}, "
+                  f"hosted_event_count {row.hosted_event_count} != {row.actual_events}")
+        if fix and drifted:
+            await session.commit()
+            await fix_drift(session, [row.id for row in drifted])
+            print(f"{len(drifted)} user(s) recounted")
+        else:
+            print(f"{len(drifted)} user(s) with drifted counters")
+    return 1 if drifted and not fix else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--fix" in sys.argv[1:])))
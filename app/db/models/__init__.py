@@ -1,3 +1,4 @@
 from .user import User, Role
 from .event import Event
-from .booking import Booking
+from .booking import Booking, BookingStatus
+from .archive import EventArchive, BookingArchive
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+import uuid
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy import Column, Index, Enum as SAEnum
+from app.db.models.booking import BookingStatus
+
+# Cold storage for past events and old cancelled bookings. Rows are moved here
+# by ArchiveService so the hot tables and their indexes only hold live data.
+# Columns mirror Event and Booking; event_id has no foreign key because the
+# referenced event may live in either table.
+
+class EventArchive(SQLModel, table=True):
+    __tablename__ = "event_archive"
+    __table_args__ = (
+        Index("ix_event_archive_organizer_id_date", "organizer_id", "date"),
+    )
+
+    id: uuid.UUID = Field(sa_column=Column(pg.UUID, primary_key=True, nullable=False))
+
+    title: str
+    description: str
+    date: datetime
+    location: str
+
+    capacity: int
+    booked_seats: int
+
+    organizer_id: Optional[uuid.UUID] = Field(
+        default=None,
+        foreign_key="user.id",
+        ondelete="CASCADE"
+    )
+
+class BookingArchive(SQLModel, table=True):
+    __tablename__ = "booking_archive"
+    __table_args__ = (
+        Index("ix_booking_archive_user_id_booking_date", "user_id", "booking_date"),
+        Index("ix_booking_archive_event_id", "event_id"),
+    )
+
+    id: uuid.UUID = Field(sa_column=Column(pg.UUID, primary_key=True, nullable=False))
+    user_id: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE", nullable=False)
+    event_id: uuid.UUID = Field(nullable=False)
+    booking_date: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False))
+    status: BookingStatus = Field(
+        sa_column=Column(
+            SAEnum(
+                BookingStatus,
+                name="booking_status_enum",
+                values_callable=lambda obj: [e.value for e in obj],
+            ),
+            nullable=False,
+        )
+    )
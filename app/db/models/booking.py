@@ -2,24 +2,45 @@ from datetime import datetime
 from sqlmodel import Field, SQLModel
 import uuid
 from sqlalchemy.dialects import postgresql as pg
-from sqlalchemy import Column, UniqueConstraint
+from sqlalchemy import Column, Index, UniqueConstraint, text, Enum as SAEnum
+from enum import Enum
+
+class BookingStatus(str, Enum):
+    CONFIRMED = "confirmed"
+    CANCELLED = "cancelled"
 
 class Booking(SQLModel, table=True):
     __tablename__ = "booking"
     __table_args__ = (
         UniqueConstraint("user_id", "event_id", name="unique_user_event_booking"),
+        Index("ix_booking_event_id", "event_id"),
+        Index("ix_booking_event_id_confirmed", "event_id", "user_id", postgresql_where=text("status = 'confirmed'")),
+        Index("ix_booking_user_id_booking_date", "user_id", "booking_date"),
+        # Archival picks old cancelled bookings
+        Index("ix_booking_cancelled_booking_date", "booking_date", postgresql_where=text("status = 'cancelled'")),
     )
 
     id: uuid.UUID = Field(
         sa_column=Column(
             pg.UUID,
             primary_key=True,
-            unique=True,
             nullable=False,
-            default=uuid.uuid4,
+            # Time-ordered keys keep inserts at the right edge of the B-tree
+            default=uuid.uuid7,
         )
     )
     user_id: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE", nullable=False)
     event_id: uuid.UUID = Field(foreign_key="event.id", ondelete="CASCADE", nullable=False)
     booking_date: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False, default=datetime.utcnow))
-    status: str = Field(default="confirmed") # confirmed, cancelled
+    status: BookingStatus = Field(
+        sa_column=Column(
+            SAEnum(
+                BookingStatus,
+                name="booking_status_enum",
+                values_callable=lambda obj: [e.value for e in obj],
+            ),
+            nullable=False,
+            server_default=BookingStatus.CONFIRMED.value,
+        ),
+        default=BookingStatus.CONFIRMED,
+    )
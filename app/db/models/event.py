@@ -4,19 +4,24 @@ from sqlmodel import Field, SQLModel, Relationship
 from app.db.models.booking import Booking
 import uuid
 from sqlalchemy.dialects import postgresql as pg
-from sqlalchemy import Column
+from sqlalchemy import Column, Index, text
 
 
 class Event(SQLModel, table=True):
     __tablename__ = "event"
+    # fillfactor 80 (room for HOT updates of booked_seats) is set by migration a3f1c9d27b64
+    __table_args__ = (
+        Index("ix_event_date", "date"),
+        Index("ix_event_organizer_id_date", "organizer_id", "date"),
+        Index("ix_event_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(
             pg.UUID,
             primary_key=True,
-            unique=True,
             nullable=False,
-            default=uuid.uuid4,
+            default=uuid.uuid7,
         )
     )
 
@@ -28,6 +33,9 @@ class Event(SQLModel, table=True):
     capacity: int = Field(default=100)
     booked_seats: int = Field(default=0)
 
+    # Set on delete; bookings and the row itself are removed later by PurgeService
+    deleted_at: Optional[datetime] = Field(default=None, sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=True))
+
     organizer_id: Optional[uuid.UUID] = Field(
         default=None, 
         foreign_key="user.id", 
@@ -1,9 +1,10 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from sqlmodel import Field, SQLModel, Relationship
 from app.db.models.booking import Booking
 import uuid
 from sqlalchemy.dialects import postgresql as pg
-from sqlalchemy import Enum as SAEnum, Column
+from sqlalchemy import Enum as SAEnum, Column, Index, Integer, text
 from enum import Enum
 
 class Role(str, Enum):
@@ -13,12 +14,17 @@ class Role(str, Enum):
 
 class User(SQLModel, table=True):
     __tablename__ = "user"
+    __table_args__ = (
+        # Lets the purge worker find soft-deleted users without a full scan
+        Index("ix_user_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        # Admin listings page through one role in id order
+        Index("ix_user_role_id", "role", "id", postgresql_where=text("deleted_at IS NULL")),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(
             pg.UUID,
             primary_key=True,
-            unique=True,
             nullable=False,
             default=uuid.uuid4,
         )
@@ -38,5 +44,13 @@ class User(SQLModel, table=True):
         default=Role.ATTENDEE,
     )
 
+    # Kept current by triggers on booking/event and their archive tables
+    # (see migration d7a3b5e81f40); check drift with `python -m app.db.counters`
+    booking_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    hosted_event_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+
+    # Set on delete; the row and everything hanging off it is removed later by PurgeService
+    deleted_at: Optional[datetime] = Field(default=None, sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=True))
+
     events: List["Event"] = Relationship(back_populates="organizer", cascade_delete=True)
     booked_events: List["Event"] = Relationship(back_populates="attendees", link_model=Booking)
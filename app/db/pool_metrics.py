@@ -0,0 +1,59 @@
+import os, time
+from typing import Dict
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+class PoolMetrics:
+    """Counters for one engine's pool in this worker process."""
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_peak = 0
+
+    def record_checkout(self, wait: float, overflow: int) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.overflow_peak = max(self.overflow_peak, overflow)
+
+# Keyed by the pool's logging name so counters survive pool.recreate() on dispose
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long callers wait for a connection."""
+
+    @property
+    def metrics(self) -> PoolMetrics:
+        return pool_metrics.setdefault(self._orig_logging_name or "default", PoolMetrics())
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, max(0, self.overflow()))
+        return record
+
+def get_pool_stats(engine: AsyncEngine) -> dict:
+    """Snapshot of the engine's pool for this worker."""
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    return {
+        "name": pool._orig_logging_name or "default",
+        "pid": os.getpid(),
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow_in_use": max(0, pool.overflow()),
+        "overflow_peak": metrics.overflow_peak,
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_avg_ms": round(metrics.wait_total / metrics.checkouts * 1000, 3) if metrics.checkouts else 0.0,
+        "wait_max_ms": round(metrics.wait_max * 1000, 3),
+    }
@@ -1,9 +1,9 @@
 from uuid import UUID
-from pydantic import BaseModel, EmailStr, Field
-from app.schemas.user import UserResponseBase
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from app.schemas.user import UserResponseBase, UserSignUpRole
 from app.schemas.booking import BookingRead
 from app.schemas.event import EventResponseBase
-from typing import List
+from typing import List, Optional
 
 # Request schemas
 class AdminRequestBase(BaseModel):
@@ -50,9 +50,111 @@ class UserWithStats(UserResponseBase):
     booking_count: int = 0
     event_count: int = 0
 
+class UserWithStatsPage(BaseModel):
+    items: List[UserWithStats]
+    # Pass back as `cursor` to fetch the next page; null on the last page
+    next_cursor: Optional[UUID] = None
+
 class UserDetailResponse(UserWithStats):
+    # Latest entries only; follow the cursors on /details/{id}/bookings and /events
     bookings: List[BookingRead] = []
     events: List[EventResponseBase] = []
+    bookings_next_cursor: Optional[str] = None
+    events_next_cursor: Optional[str] = None
+
+class UserBookingsPage(BaseModel):
+    items: List[BookingRead]
+    next_cursor: Optional[str] = None
+
+class UserEventsPage(BaseModel):
+    items: List[EventResponseBase]
+    next_cursor: Optional[str] = None
 
 class UserRoleUpdateAdmin(BaseModel):
     role: str
+
+# Bulk import: one CSV row per user, with either a plain password or an argon2 hash
+class UserImportRow(BaseModel):
+    email: EmailStr
+    password: Optional[str] = Field(default=None, min_length=8, max_length=64)
+    password_hash: Optional[str] = None
+    role: UserSignUpRole = UserSignUpRole.attendee
+
+    # CSV has no null, so an empty cell means the column was left out
+    @field_validator("password", "password_hash", mode="before")
+    @classmethod
+    def empty_password(cls, value):
+        return value or None
+
+    @field_validator("role", mode="before")
+    @classmethod
+    def empty_role(cls, value):
+        return value or UserSignUpRole.attendee
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if (self.password is None) == (self.password_hash is None):
+            raise ValueError("Provide exactly one of password or password_hash")
+        if self.password_hash is not None and not self.password_hash.startswith("$argon2"):
+            raise ValueError("password_hash must be an argon2 hash")
+        return self
+
+class UserImportError(BaseModel):
+    line: int
+    errors: List[str]
+
+class UserImportProgress(BaseModel):
+    processed: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    done: bool = False
+
+# Instrumentation Schemas
+class PoolStatsResponse(BaseModel):
+    name: str
+    pid: int
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow_in_use: int
+    overflow_peak: int
+    checkouts: int
+    timeouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
+
+class ToolTokenStats(BaseModel):
+    name: str
+    calls: int
+    rows: int
+    tokens: int
+    json_tokens: int
+
+class ResponseCacheStats(BaseModel):
+    hits: int
+    misses: int
+    stored: int
+    entries: int
+
+class IntentStats(BaseModel):
+    local: int
+    llm: int
+    llm_agreed: int
+    sampled: int
+    sampled_agreed: int
+
+class ReflectionStats(BaseModel):
+    reflected: int
+    skipped: int
+    critiques: int
+    sampled: int
+    sampled_failed: int
+
+class ChatStatsResponse(BaseModel):
+    pid: int
+    tools: List[ToolTokenStats]
+    cache: ResponseCacheStats
+    intents: IntentStats
+    reflection: ReflectionStats
@@ -1,7 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from sqlmodel import SQLModel
+from app.schemas.user import UserResponseBase
 
 # Properties to return to client
 class BookingRead(SQLModel):
@@ -17,3 +18,8 @@ class BookingCreate(SQLModel):
 class BookingMessageResponse(SQLModel):
     message: str
     booking: Optional[BookingRead] = None
+
+class GuestListPage(SQLModel):
+    items: List[UserResponseBase]
+    # Pass back as `cursor` to fetch the next page; null on the last page
+    next_cursor: Optional[UUID] = None
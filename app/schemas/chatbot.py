@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import ClassVar, List, Union
 
 class ChatRequest(BaseModel):
     query: str = Field(default="Hi, how are you?")
@@ -7,9 +7,32 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
+# Events of a streamed reply; event is the SSE event type each is sent as
+
+class ChatToken(BaseModel):
+    event: ClassVar[str] = "token"
+    text: str
+
+class ChatToolStart(BaseModel):
+    event: ClassVar[str] = "tool-start"
+    tool: str
+
+class ChatToolEnd(BaseModel):
+    event: ClassVar[str] = "tool-end"
+    tool: str
+    ok: bool
+
+class ChatDone(BaseModel):
+    event: ClassVar[str] = "done"
+
+ChatEvent = Union[ChatToken, ChatToolStart, ChatToolEnd, ChatDone]
+
 class IntentClassification(BaseModel):
     intent: str = Field(description="The categorized intent")
 
+class IntentClassifications(BaseModel):
+    intents: List[str] = Field(description="One categorized intent per numbered message, in the same order")
+
 class DecomposedQueries(BaseModel):
     queries: List[str] = Field(description="List of cleaned and decomposed individual queries. Returns precisely ['other'] if entirely unrelated.")
 
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional
 from sqlmodel import SQLModel
 from uuid import UUID
 
@@ -74,3 +74,12 @@ class EventCreateResponse(EventMessageResponse):
 
 class EventUpdateResponse(EventMessageResponse):
     event: EventResponseBase
+
+class EventImportError(SQLModel):
+    # Line number in the uploaded file
+    line: int
+    errors: List[str]
+
+class EventImportResponse(EventMessageResponse):
+    imported: int
+    errors: List[EventImportError] = []
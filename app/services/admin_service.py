@@ -1,20 +1,59 @@
-from typing import Optional
+import csv, uuid
+from typing import AsyncIterator, Iterable, List, Optional, Tuple, Union
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
 
 from app.db.models.user import User, Role
-from app.schemas.admin import AdminSignUpRequest, AdminUpdate
-from app.core.utils import generate_password_hash, verify_password
+from app.db.async_session import stream_rows, mark_written
+from app.core.config import settings
+from app.schemas.admin import AdminSignUpRequest, AdminUpdate, UserImportRow, UserImportError, UserImportProgress
+from app.core.utils import generate_password_hash, generate_password_hashes, verify_password, encode_cursor, decode_cursor
+
+# Bookings and events shown per page of the user detail view
+DETAIL_PAGE_SIZE = 20
+
+# Listings select plain columns: no ORM identity map to grow while streaming
+USER_STATS_COLUMNS = (User.id, User.email, User.role, User.booking_count, User.hosted_event_count)
+
+USER_IMPORT_COLUMNS = ["line", "id", "email", "password", "role"]
+
+CREATE_USER_IMPORT = text("""
+CREATE TEMP TABLE user_import (
+    line integer NOT NULL,
+    id uuid NOT NULL,
+    email text NOT NULL,
+    password text NOT NULL,
+    role text NOT NULL
+) ON COMMIT DROP
+""")
+
+# ON CONFLICT against the unique ix_user_email index drops emails that are
+# already registered, or repeated within the batch, in the same statement;
+# every staged line that was not inserted comes back as skipped.
+MERGE_USER_IMPORT = text("""
+WITH inserted AS (
+    INSERT INTO "user" (id, email, password, role)
+    SELECT id, email, password, role::role_enum FROM user_import ORDER BY line
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id
+)
+SELECT s.line FROM user_import s
+WHERE NOT EXISTS (SELECT 1 FROM inserted i WHERE i.id = s.id)
+ORDER BY s.line
+""")
 
 class AdminService:
     async def get_user_by_email(self, session: AsyncSession, email: str) -> Optional[User]:
-        statement = select(User).where(User.email == email)
+        statement = select(User).where(User.email == email, User.deleted_at.is_(None))
         result = await session.exec(statement)
         return result.first()
     
     async def get_user_by_id(self, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        statement = select(User).where(User.id == user_id)
+        statement = select(User).where(User.id == user_id, User.deleted_at.is_(None))
         result = await session.exec(statement)
         return result.first()
     
@@ -60,60 +99,157 @@ class AdminService:
         return user
     
     async def delete_admin(self, session: AsyncSession, user: User) -> bool:
-        await session.delete(user)
-        await session.commit()
+        from app.services.user_service import user_service
+        await user_service.delete_user(session, user)
         return True
 
-    async def list_attendees(self, session: AsyncSession):
-        """List all attendees with their booking counts."""
-        # This requires importing Booking inside logic or top level.
-        # Avoid circular imports if possible.
-        from app.db.models.booking import Booking
-        from sqlalchemy import func as sa_func
-
-        # Select User and Count(Booking)
-        # Left join to include users with 0 bookings
-        statement = select(User, sa_func.count(Booking.id)).outerjoin(Booking, User.id == Booking.user_id).where(User.role == Role.ATTENDEE.value).group_by(User.id)
-        
-        result = await session.exec(statement)
+    def _user_listing(self, role: Role, counter, cursor: Optional[UUID], email_prefix: Optional[str], min_count: Optional[int], max_count: Optional[int]):
+        """Keyset-ordered listing of live users with a role, filtered on one of the counters."""
+        statement = select(*USER_STATS_COLUMNS).where(User.role == role.value, User.deleted_at.is_(None))
+        if cursor:
+            statement = statement.where(User.id > cursor)
+        if email_prefix:
+            statement = statement.where(User.email.startswith(email_prefix, autoescape=True))
+        if min_count is not None:
+            statement = statement.where(counter >= min_count)
+        if max_count is not None:
+            statement = statement.where(counter <= max_count)
+        return statement.order_by(User.id)
+
+    async def list_attendees(self, session: AsyncSession, cursor: Optional[UUID] = None, limit: int = 50, email_prefix: Optional[str] = None, min_bookings: Optional[int] = None, max_bookings: Optional[int] = None) -> List:
+        """One page of attendees after cursor; booking counts come from the user.booking_count counter."""
+        statement = self._user_listing(Role.ATTENDEE, User.booking_count, cursor, email_prefix, min_bookings, max_bookings)
+        result = await session.execute(statement.limit(limit))
         return result.all()
 
-    async def list_organizers(self, session: AsyncSession):
-        """List all organizers with their hosted event counts."""
-        from app.db.models.event import Event
-        from sqlalchemy import func as sa_func
+    def stream_attendees(self, session: AsyncSession, cursor: Optional[UUID] = None, email_prefix: Optional[str] = None, min_bookings: Optional[int] = None, max_bookings: Optional[int] = None) -> AsyncIterator:
+        """Every matching attendee after cursor, read in batches from a server-side cursor."""
+        statement = self._user_listing(Role.ATTENDEE, User.booking_count, cursor, email_prefix, min_bookings, max_bookings)
+        return stream_rows(session, statement)
 
-        # Select User and Count(Event)
-        statement = select(User, sa_func.count(Event.id)).outerjoin(Event, User.id == Event.organizer_id).where(User.role == Role.ORGANIZER.value).group_by(User.id)
-        
-        result = await session.exec(statement)
+    async def list_organizers(self, session: AsyncSession, cursor: Optional[UUID] = None, limit: int = 50, email_prefix: Optional[str] = None, min_events: Optional[int] = None, max_events: Optional[int] = None) -> List:
+        """One page of organizers after cursor; event counts come from the user.hosted_event_count counter."""
+        statement = self._user_listing(Role.ORGANIZER, User.hosted_event_count, cursor, email_prefix, min_events, max_events)
+        result = await session.execute(statement.limit(limit))
         return result.all()
 
-    async def get_user_stats(self, session: AsyncSession, user_id: UUID):
-        """Get user details with both booking and event counts."""
-        from app.db.models.booking import Booking
-        from app.db.models.event import Event
-        from sqlalchemy import func as sa_func
+    def stream_organizers(self, session: AsyncSession, cursor: Optional[UUID] = None, email_prefix: Optional[str] = None, min_events: Optional[int] = None, max_events: Optional[int] = None) -> AsyncIterator:
+        """Every matching organizer after cursor, read in batches from a server-side cursor."""
+        statement = self._user_listing(Role.ORGANIZER, User.hosted_event_count, cursor, email_prefix, min_events, max_events)
+        return stream_rows(session, statement)
+
+    def _decode_cursor(self, cursor: Optional[str]):
+        if not cursor:
+            return None
+        after = decode_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        return after
 
+    async def get_user_bookings_page(self, session: AsyncSession, user_id: UUID, cursor: Optional[str] = None, limit: int = DETAIL_PAGE_SIZE) -> Tuple[List, Optional[str]]:
+        """Latest bookings of a user (live and archived) plus the cursor of the next page."""
+        from app.services.booking_service import booking_service
+
+        bookings = await booking_service.get_user_bookings(session, user_id, self._decode_cursor(cursor), limit)
+        next_cursor = encode_cursor(bookings[-1].booking_date, bookings[-1].id) if len(bookings) == limit else None
+        return bookings, next_cursor
+
+    async def get_user_events_page(self, session: AsyncSession, user_id: UUID, cursor: Optional[str] = None, limit: int = DETAIL_PAGE_SIZE) -> Tuple[List, Optional[str]]:
+        """Latest hosted events of a user (live and archived) plus the cursor of the next page."""
+        from app.services.event_service import event_service
+
+        events = await event_service.get_organizer_events(session, user_id, self._decode_cursor(cursor), limit)
+        next_cursor = encode_cursor(events[-1].date, events[-1].id) if len(events) == limit else None
+        return events, next_cursor
+
+    async def get_user_stats(self, session: AsyncSession, user_id: UUID, limit: int = DETAIL_PAGE_SIZE):
+        """
+        Get user details: counts come from the user counters, and only the first
+        page of bookings and events is loaded. Returns (user, bookings page, events page).
+        """
         user = await self.get_user_by_id(session, user_id)
         if not user:
-            return None, 0, 0
+            return None, ([], None), ([], None)
+
+        # The counters include every row either page could show (all statuses,
+        # archives too), so a zero means that page is empty; most users only
+        # book or only host, which leaves one page query instead of two
+        bookings_page = await self.get_user_bookings_page(session, user_id, limit=limit) if user.booking_count else ([], None)
+        events_page = await self.get_user_events_page(session, user_id, limit=limit) if user.hosted_event_count else ([], None)
+        return user, bookings_page, events_page
+
+    async def _import_user_batch(self, session: AsyncSession, batch: List[Tuple[int, UserImportRow]]) -> List[int]:
+        """Hash, COPY and merge one batch in its own transaction. Returns the skipped lines."""
+        hashes = iter(await generate_password_hashes([row.password for _, row in batch if row.password_hash is None]))
+        records = [
+            (line, uuid.uuid4(), row.email, row.password_hash or next(hashes), row.role.value)
+            for line, row in batch
+        ]
+
+        await session.execute(CREATE_USER_IMPORT)
+        connection = await session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        await driver_connection.copy_records_to_table("user_import", records=records, columns=USER_IMPORT_COLUMNS)
+        skipped = (await session.execute(MERGE_USER_IMPORT)).scalars().all()
+
+        # COPY and the text() merge bypass the ORM write tracking
+        mark_written(session)
+        await session.commit()
+        return skipped
+
+    async def import_users(self, session: AsyncSession, rows: Iterable[Tuple[int, Union[dict, str]]]) -> AsyncIterator[BaseModel]:
+        """
+        Import users from uploaded rows in batches of USER_IMPORT_BATCH_SIZE, one
+        transaction each. Yields an error per rejected line and a progress
+        report after every batch, the last one with done set.
+        """
+        progress = UserImportProgress()
+        batch = []
 
-        # Count Bookings
-        booking_count_stmt = select(sa_func.count(Booking.id)).where(Booking.user_id == user_id)
-        booking_count = (await session.exec(booking_count_stmt)).first() or 0
+        async def flush():
+            skipped = await self._import_user_batch(session, batch)
+            progress.imported += len(batch) - len(skipped)
+            progress.skipped += len(skipped)
+            return [UserImportError(line=line, errors=["Email already registered"]) for line in skipped]
 
-        # Count Hosted Events
-        event_count_stmt = select(sa_func.count(Event.id)).where(Event.organizer_id == user_id)
-        event_count = (await session.exec(event_count_stmt)).first() or 0
+        rows = iter(rows)
+        while True:
+            # The response is already streaming, so an unreadable file is
+            # reported in-band and ends the import after the rows read so far
+            try:
+                line, data = next(rows)
+            except StopIteration:
+                break
+            except (UnicodeDecodeError, csv.Error) as e:
+                yield UserImportError(line=progress.processed + 1, errors=[f"Could not read file: {e}"])
+                break
 
-        bookings_stmt = select(Booking).where(Booking.user_id == user_id)
-        bookings = (await session.exec(bookings_stmt)).all()
+            progress.processed += 1
+            if isinstance(data, str):
+                progress.failed += 1
+                yield UserImportError(line=line, errors=[data])
+                continue
+            try:
+                row = UserImportRow.model_validate(data)
+            except ValidationError as e:
+                progress.failed += 1
+                yield UserImportError(line=line, errors=[
+                    f"{'.'.join(str(loc) for loc in error['loc']) or 'row'}: {error['msg']}" for error in e.errors()
+                ])
+                continue
 
-        events_stmt = select(Event).where(Event.organizer_id == user_id)
-        events = (await session.exec(events_stmt)).all()
+            batch.append((line, row))
+            if len(batch) >= settings.USER_IMPORT_BATCH_SIZE:
+                for error in await flush():
+                    yield error
+                batch = []
+                yield progress.model_copy()
 
-        return user, booking_count, event_count, bookings, events
+        if batch:
+            for error in await flush():
+                yield error
+        progress.done = True
+        yield progress
 
     async def update_user_role(self, session: AsyncSession, user: User, new_role: str) -> User:
         user.role = new_role
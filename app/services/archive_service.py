@@ -0,0 +1,102 @@
+import asyncio, logging
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.models.archive import EventArchive, BookingArchive
+
+logger = logging.getLogger(__name__)
+
+def _columns(table) -> str:
+    return ", ".join(f'"{c.name}"' for c in table.columns)
+
+# The archive tables define what is copied; hot-only columns such as deleted_at stay behind
+EVENT_COLUMNS = _columns(EventArchive.__table__)
+BOOKING_COLUMNS = _columns(BookingArchive.__table__)
+
+# Each statement moves one batch atomically. SKIP LOCKED lets archival run
+# next to live traffic without waiting on rows that are being booked.
+ARCHIVE_EVENTS_BATCH = text(f"""
+WITH ev AS (
+    SELECT id FROM event
+    WHERE date < :cutoff AND deleted_at IS NULL
+    ORDER BY date
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+), moved_bookings AS (
+    DELETE FROM booking WHERE event_id IN (SELECT id FROM ev)
+    RETURNING {BOOKING_COLUMNS}
+), archived_bookings AS (
+    INSERT INTO booking_archive ({BOOKING_COLUMNS})
+    SELECT {BOOKING_COLUMNS} FROM moved_bookings
+), moved_events AS (
+    DELETE FROM event WHERE id IN (SELECT id FROM ev)
+    RETURNING {EVENT_COLUMNS}
+)
+INSERT INTO event_archive ({EVENT_COLUMNS})
+SELECT {EVENT_COLUMNS} FROM moved_events
+""")
+
+ARCHIVE_CANCELLED_BATCH = text(f"""
+WITH moved AS (
+    DELETE FROM booking WHERE id IN (
+        SELECT id FROM booking
+        WHERE status = 'cancelled' AND booking_date < :cutoff
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING {BOOKING_COLUMNS}
+)
+INSERT INTO booking_archive ({BOOKING_COLUMNS})
+SELECT {BOOKING_COLUMNS} FROM moved
+""")
+
+class ArchiveService:
+    async def archive_past_events(self, session: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+        """Move one batch of events dated before cutoff, together with all their bookings."""
+        result = await session.execute(ARCHIVE_EVENTS_BATCH, {"cutoff": cutoff, "batch_size": batch_size})
+        await session.commit()
+        return result.rowcount
+
+    async def archive_cancelled_bookings(self, session: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+        """Move one batch of cancelled bookings made before cutoff."""
+        result = await session.execute(ARCHIVE_CANCELLED_BATCH, {"cutoff": cutoff, "batch_size": batch_size})
+        await session.commit()
+        return result.rowcount
+
+    async def run(self, session: AsyncSession) -> dict:
+        """Archive everything past the configured retention, one short transaction per batch."""
+        # DB stores naive UTC timestamps for event dates
+        now = datetime.utcnow()
+        batch_size = settings.ARCHIVE_BATCH_SIZE
+        totals = {"events": 0, "cancelled_bookings": 0}
+
+        event_cutoff = now - timedelta(days=settings.ARCHIVE_EVENTS_AFTER_DAYS)
+        while True:
+            moved = await self.archive_past_events(session, event_cutoff, batch_size)
+            totals["events"] += moved
+            if moved < batch_size:
+                break
+
+        cancelled_cutoff = now - timedelta(days=settings.ARCHIVE_CANCELLED_AFTER_DAYS)
+        while True:
+            moved = await self.archive_cancelled_bookings(session, cancelled_cutoff, batch_size)
+            totals["cancelled_bookings"] += moved
+            if moved < batch_size:
+                break
+
+        logger.info("Archived %(events)s events and %(cancelled_bookings)s cancelled bookings", totals)
+        return totals
+
+archive_service = ArchiveService()
+
+async def main() -> None:
+    from app.db.async_session import async_session
+    async with async_session() as session:
+        totals = await archive_service.run(session)
+    print(totals)
+
+if __name__ == "__main__":
+    # Meant to be run periodically, e.g. from cron: uv run python -m app.services.archive_service
+    asyncio.run(main())
@@ -1,20 +1,25 @@
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import UUID
+from sqlalchemy import exists, union_all, literal_column, tuple_
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException, status
 
-from app.db.models.booking import Booking
+from app.db.models.booking import Booking, BookingStatus
 from app.db.models.event import Event
 from app.db.models.user import User
+from app.db.models.archive import BookingArchive
+from app.db.async_session import stream_rows
+from app.core.redis import bump_events_version
+from app.schemas.booking import BookingRead
 
 class BookingService:
     async def create_booking(self, session: AsyncSession, user_id: UUID, event_id: UUID) -> Booking:
         # 2. Check Event Date & Capacity with Row Lock for Concurrency
         # We re-fetch the event with a lock to ensure accurate booked_seats count
         # This prevents race conditions where multiple users book the last seat simultaneously.
-        statement = select(Event).where(Event.id == event_id).with_for_update()
+        statement = select(Event).where(Event.id == event_id, Event.deleted_at.is_(None)).with_for_update()
         result = await session.exec(statement)
         event = result.one_or_none()
         
@@ -32,11 +37,11 @@ class BookingService:
         existing_booking = (await session.exec(statement)).first()
         
         if existing_booking:
-            if existing_booking.status == "confirmed":
+            if existing_booking.status == BookingStatus.CONFIRMED:
                 raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already booked this event")
             
             # If cancelled, reactivate it
-            existing_booking.status = "confirmed"
+            existing_booking.status = BookingStatus.CONFIRMED
             from datetime import timezone
             existing_booking.booking_date = datetime.now(timezone.utc) # Update timestamp to UTC
             new_booking = existing_booking
@@ -44,7 +49,7 @@ class BookingService:
 
         else:
             # 5. Create New Booking
-            new_booking = Booking(user_id=user_id, event_id=event_id, status="confirmed")
+            new_booking = Booking(user_id=user_id, event_id=event_id, status=BookingStatus.CONFIRMED)
             session.add(new_booking)
         
         # 6. Update Event Seats
@@ -52,13 +57,32 @@ class BookingService:
         session.add(event)
         
         await session.commit()
+        # Seat counts show in cached chatbot answers
+        await bump_events_version()
         await session.refresh(new_booking)
         return new_booking
 
-    async def get_user_bookings(self, session: AsyncSession, user_id: UUID) -> List[Booking]:
-        statement = select(Booking).where(Booking.user_id == user_id).order_by(Booking.booking_date.desc())
-        result = await session.exec(statement)
-        return result.all()
+    async def get_user_bookings(self, session: AsyncSession, user_id: UUID, after: Optional[Tuple[datetime, UUID]] = None, limit: Optional[int] = None) -> List[BookingRead]:
+        """Newest first; with limit, the page of bookings that sort after the (booking_date, id) key."""
+        # Bookings of archived events live in booking_archive; read across both
+        branches = []
+        for model in (Booking, BookingArchive):
+            statement = select(model.id, model.event_id, model.user_id, model.booking_date, model.status).where(model.user_id == user_id)
+            if model is Booking:
+                # Bookings of deleted events stay until PurgeService removes them; hide them now
+                statement = statement.where(~exists().where(Event.id == Booking.event_id, Event.deleted_at.is_not(None)))
+            if after:
+                statement = statement.where(tuple_(model.booking_date, model.id) < after)
+            if limit:
+                # Limit each side too, so both stop early on their (user_id, booking_date) index
+                statement = statement.order_by(model.booking_date.desc(), model.id.desc()).limit(limit)
+            branches.append(select(statement.subquery()))
+
+        statement = union_all(*branches).order_by(literal_column("booking_date").desc(), literal_column("id").desc())
+        if limit:
+            statement = statement.limit(limit)
+        result = await session.execute(statement)
+        return [BookingRead.model_validate(row) for row in result.all()]
 
     async def cancel_booking(self, session: AsyncSession, booking_id: UUID, current_user: User) -> Booking:
     
@@ -71,11 +95,11 @@ class BookingService:
         if booking.user_id != current_user.id and current_user.role != "admin":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to cancel this booking")
 
-        if booking.status == "cancelled":
+        if booking.status == BookingStatus.CANCELLED:
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Booking is already cancelled")
              
         # Update Status
-        booking.status = "cancelled"
+        booking.status = BookingStatus.CANCELLED
         session.add(booking)
         
         # Update Event Seats with a row lock to prevent race conditions during simultaneous cancellations
@@ -88,13 +112,31 @@ class BookingService:
             session.add(event)
             
         await session.commit()
+        await bump_events_version()
         await session.refresh(booking)
         return booking
 
-    async def get_event_attendees(self, session: AsyncSession, event_id: UUID) -> List[User]:
-        # Join Booking and User
-        statement = select(User).join(Booking).where(Booking.event_id == event_id, Booking.status == "confirmed")
-        result = await session.exec(statement)
+    def _guest_list(self, event_id: UUID, after: Optional[UUID] = None):
+        # Only the exported columns; walks ix_booking_event_id_confirmed in user_id order
+        statement = (
+            select(User.id, User.email, User.role)
+            .join(Booking, Booking.user_id == User.id)
+            .where(Booking.event_id == event_id, Booking.status == BookingStatus.CONFIRMED, User.deleted_at.is_(None))
+        )
+        if after:
+            statement = statement.where(Booking.user_id > after)
+        return statement.order_by(Booking.user_id)
+
+    async def get_event_attendees(self, session: AsyncSession, event_id: UUID, after: Optional[UUID] = None, limit: Optional[int] = None) -> List:
+        """Confirmed attendees as (id, email, role) rows; with limit, the page after the given user id."""
+        statement = self._guest_list(event_id, after)
+        if limit:
+            statement = statement.limit(limit)
+        result = await session.execute(statement)
         return result.all()
 
+    def stream_event_attendees(self, session: AsyncSession, event_id: UUID) -> AsyncIterator:
+        """Every confirmed attendee, read in batches from a server-side cursor."""
+        return stream_rows(session, self._guest_list(event_id))
+
 booking_service = BookingService()
@@ -0,0 +1,68 @@
+import hashlib, json, time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from rapidfuzz import utils
+from langchain_core.messages import BaseMessage
+from app.core.config import settings
+from app.core.redis import get_events_version
+
+# Only answers built from these tools are cached; anything that wrote or read
+# per-user data (bookings, attendees) always goes to the agent.
+READ_ONLY_TOOLS = frozenset({"list_events", "search_events"})
+
+class ResponseCache:
+    """
+    Per-worker LRU of agent answers to read-only event questions, keyed on the
+    normalised sub-query, its intent, the user's role (the system prompt
+    differs per role), a digest of the conversation so far (the agent reads
+    it, so "book the second one" means something different in every thread)
+    and the events version from Redis. Creating, updating
+    or deleting an event, and booking or cancelling a seat, bumps the
+    version, so cached answers about the old data stop matching and age out
+    of the LRU.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, str, Dict[str, UUID]]]" = OrderedDict()
+        # hits, misses and stored, for this worker; served by GET /admin/chat-stats
+        self.stats = Counter()
+
+    async def key(self, query: str, intent: str, role: str, history: List[BaseMessage]) -> Optional[Tuple]:
+        """Cache key for a sub-query, or None when the events version cannot be read."""
+        version = await get_events_version()
+        if version is None:
+            return None
+        return (utils.default_process(query), intent, role, _digest(history), version)
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, Dict[str, UUID]]]:
+        """The answer and the row handles it mentions, which the asking user needs to act on it."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        self.stats["hits" if entry else "misses"] += 1
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def put(self, key: Tuple, answer: str, handles: Dict[str, UUID]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, answer, handles)
+        self._entries.move_to_end(key)
+        self.stats["stored"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _digest(history: List[BaseMessage]) -> str:
+    if not history:
+        return ""
+    turns = json.dumps([(m.type, m.content) for m in history])
+    return hashlib.blake2b(turns.encode(), digest_size=16).hexdigest()
+
+response_cache = ResponseCache(settings.CHAT_CACHE_MAX_ENTRIES, settings.CHAT_CACHE_TTL_SECONDS)
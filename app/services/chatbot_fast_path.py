@@ -0,0 +1,75 @@
+from typing import Optional
+from rapidfuzz import fuzz
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.db.models.user import User, Role
+from app.services.event_service import event_service
+from app.services.booking_service import booking_service
+from app.services.chatbot_intents import IntentClassifier
+from app.services.chatbot_memory import chat_history
+from app.services.chatbot_instructions import FAST_PATH_EXAMPLES
+
+# Bookings listed by the fast path; the agent is still there for anything more specific
+FAST_PATH_BOOKINGS = 20
+
+CAPABILITIES = {
+    Role.ORGANIZER.value: "find events, and create, update or delete your own events and see who is attending them",
+    Role.ATTENDEE.value: "find events, book tickets, and show or cancel your bookings",
+}
+
+class ChatbotFastPath:
+    """
+    Answers the most common requests ("List all available events", "Show me
+    my current bookings", greetings) with one database read and a template,
+    skipping decomposition, intent detection, the agent loop and reflection.
+    Matching uses plain Levenshtein ratio, so only near-verbatim messages are
+    routed here; anything with extra detail goes to the agent.
+    """
+    def __init__(self):
+        self.routes = IntentClassifier(FAST_PATH_EXAMPLES, settings.CHAT_FAST_PATH_THRESHOLD, 0.0, scorer=fuzz.ratio)
+
+    async def answer(self, query: str, user: User, session: AsyncSession) -> Optional[str]:
+        """The full reply if the message has a fast path, otherwise None."""
+        match = self.routes.classify(query)
+        if not match.confident:
+            return None
+
+        reply = await getattr(self, f"_{match.intent}")(user, session)
+        # Saved like an agent turn, so a follow-up ("book the second one") has the list in context
+        await chat_history.append(str(user.id), [HumanMessage(content=query), AIMessage(content=reply)])
+        return reply
+
+    async def _list_events(self, user: User, session: AsyncSession) -> str:
+        events = await event_service.get_all_events(session)
+        if not events:
+            return "There are no upcoming events right now."
+        lines = [
+            f"- {e.title} on {e.date:%b %d, %Y at %H:%M} in {e.location} "
+            f"({max(e.capacity - e.booked_seats, 0)} of {e.capacity} seats left, ID: {e.id})"
+            for e in events
+        ]
+        return "Here are the upcoming events:\n" + "\n".join(lines)
+
+    async def _get_user_bookings(self, user: User, session: AsyncSession) -> str:
+        bookings = await booking_service.get_user_bookings(session, user.id, limit=FAST_PATH_BOOKINGS)
+        if not bookings:
+            return "You don't have any bookings yet."
+        titles = await event_service.get_event_titles(session, [b.event_id for b in bookings])
+        lines = [
+            f"- {titles.get(b.event_id, 'Event ' + str(b.event_id))}: {b.status}, booked {b.booking_date:%b %d, %Y} (Booking ID: {b.id})"
+            for b in bookings
+        ]
+        header = "Here are your bookings:" if len(bookings) < FAST_PATH_BOOKINGS else f"Here are your {FAST_PATH_BOOKINGS} most recent bookings:"
+        return header + "\n" + "\n".join(lines)
+
+    async def _greeting(self, user: User, session: AsyncSession) -> str:
+        return f"Hello! I'm your Event Booking Assistant. I can help you {self._capabilities(user)}. What would you like to do?"
+
+    async def _help(self, user: User, session: AsyncSession) -> str:
+        return f"I'm your Event Booking Assistant. I can help you {self._capabilities(user)}. Just tell me what you need, e.g. \"Find concerts in New York\"."
+
+    def _capabilities(self, user: User) -> str:
+        return CAPABILITIES.get(user.role.value, "find events")
+
+chatbot_fast_path = ChatbotFastPath()
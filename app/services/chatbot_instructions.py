@@ -13,6 +13,55 @@ IDEAL_QUERIES = [
     "Who are you?", "Help", "Good morning"
 ]
 
+# Labelled examples for the local intent classifier; queries close enough to
+# one of these skip the LLM intent call. Extend a label when the logs show the
+# LLM repeatedly overruling or being asked about similar queries.
+INTENT_EXAMPLES = {
+    "event_query": IDEAL_QUERIES[:8] + [
+        "Create an event", "Host a new event", "Organize a workshop next Friday",
+        "Schedule a meetup", "Delete my event", "Cancel my event", "Remove the conference I created",
+        "Update my event", "Change the date of my event", "Increase the capacity of my event",
+        "Rename my event", "Who is attending my event", "List the attendees of my workshop",
+        "Show all events", "What events are coming up", "Any concerts this weekend",
+        "Find workshops in London", "Search events by location", "Show me upcoming events",
+    ],
+    "booking_query": IDEAL_QUERIES[8:14] + [
+        "Book a ticket", "Book me a seat", "Reserve a spot at the workshop", "I want to attend the meetup",
+        "Buy a ticket for the conference", "Register me for the event", "Get me a ticket",
+        "Cancel my reservation", "I can't attend, cancel my ticket", "Show my bookings",
+        "What have I booked", "List my tickets", "My reservations", "Which events am I attending",
+    ],
+    "general_query": IDEAL_QUERIES[14:] + [
+        "Hey", "Hey there", "Good afternoon", "Good evening", "Thanks", "Thank you",
+        "What can you help me with", "How do I use this", "What are you", "Are you a bot",
+    ],
+    "other": [
+        "Write me a python script", "What is the capital of France?", "Tell me a joke",
+        "What's the weather today", "Translate this to Spanish", "Solve this math problem",
+        "Who won the football match", "Write a poem", "Explain quantum physics",
+    ],
+}
+
+# Requests answered straight from the database with a template, no LLM at
+# all; only near-verbatim matches are routed here (CHAT_FAST_PATH_THRESHOLD).
+FAST_PATH_EXAMPLES = {
+    "list_events": [
+        "List all available events", "List all events", "List events", "Show all events",
+        "Show me all events", "Show events", "Show me upcoming events", "Upcoming events",
+        "What events are available", "What events are coming up",
+    ],
+    "get_user_bookings": [
+        "Show me my current bookings", "Show me my bookings", "Show my bookings", "My bookings",
+        "List my bookings", "Show my tickets", "My tickets", "What have I booked",
+    ],
+    "greeting": [
+        "Hi", "Hello", "Hey", "Hey there", "Hi there", "Good morning", "Good afternoon", "Good evening",
+    ],
+    "help": [
+        "Help", "What can you do?", "How does this bot work?", "Who are you?", "What can you help me with",
+    ],
+}
+
 INTENT_PROMPT_TEMPLATE = """
 You are an expert system for classifying user intent in an Event Booking platform based on the user's message.
 
@@ -83,6 +132,15 @@ user_response : "{query}"
 Return EXACTLY and ONLY the JSON format specified by your schema, which requires exactly ONE of these intents: {all_intents}.
 """.strip()
 
+# Same rules, several sub-queries of one message classified in a single call
+BATCH_INTENT_PROMPT_TEMPLATE = INTENT_PROMPT_TEMPLATE.replace(
+    'user_response : "{query}"',
+    'user_responses (numbered, classify each one on its own):\n{queries}',
+).replace(
+    "which requires exactly ONE of these intents: {all_intents}.",
+    "which requires a list with exactly ONE intent per numbered user_response, in the same order, each one of: {all_intents}.",
+)
+
 SYSTEM_PROMPT_TEMPLATE = """
 You are a smart and helpful Event Booking Assistant. 
 Current User Role: {user_role}.
@@ -92,11 +150,11 @@ Current User Role: {user_role}.
 ------------------------------------------------------------
 - list_events: Use this to dump all available events.
 - search_events: Use this to find specific events by title, location, or date.
-- Event Actions: Specific actions like book, update, and delete require a valid UUID **EVENT ID**.
+- Event Actions: Specific actions like book, update, and delete require a valid **EVENT ID** (the `id` column of a tool result, e.g. E3f9a1c).
 
 STRATEGY RULE: 
-If the user says "Book the rock concert", DO NOT GUESS the UUID.
-1. Call `search_events` to find the UUID.
+If the user says "Book the rock concert", DO NOT GUESS the ID.
+1. Call `search_events` to find the ID.
 2. Check the results from the tool.
 3. Extract the ID and use it in your final tool execution.
   
@@ -0,0 +1,37 @@
+from typing import Callable, Dict, List, NamedTuple, Optional
+from rapidfuzz import fuzz, process, utils
+
+class IntentMatch(NamedTuple):
+    intent: Optional[str]
+    score: float
+    # Lead over the best example of any other label
+    margin: float
+    confident: bool
+
+class IntentClassifier:
+    """
+    Nearest-neighbour intent matching over labelled example queries. A match
+    is confident when its score reaches threshold and leads the best example
+    of any other label by margin.
+    Pure CPU string scoring, well under a millisecond per query for the
+    example set, so it runs inline before any LLM call.
+    """
+    def __init__(self, examples: Dict[str, List[str]], threshold: float, margin: float, scorer: Callable = fuzz.WRatio):
+        self.threshold = threshold
+        self.margin = margin
+        self.scorer = scorer
+        # Normalised once here rather than on every comparison
+        self.choices = [utils.default_process(query) for queries in examples.values() for query in queries]
+        self.labels = [intent for intent, queries in examples.items() for _ in queries]
+
+    def classify(self, query: str) -> IntentMatch:
+        matches = process.extract(utils.default_process(query), self.choices, scorer=self.scorer, limit=10)
+        if not matches:
+            return IntentMatch(None, 0.0, 0.0, False)
+
+        _, score, index = matches[0]
+        intent = self.labels[index]
+        # A near-tie with another label ("cancel my event" vs "cancel my ticket") is not a match
+        runner_up = next((s for _, s, i in matches[1:] if self.labels[i] != intent), 0.0)
+        margin = score - runner_up
+        return IntentMatch(intent, score, margin, score >= self.threshold and margin >= self.margin)
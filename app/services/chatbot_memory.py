@@ -0,0 +1,51 @@
+import json, logging
+from typing import List
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, messages_from_dict, messages_to_dict
+from app.core.config import settings
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Conversations live in Redis, so every worker sees the same history and a
+# restart loses nothing. Each user's thread is a list capped at
+# CHAT_HISTORY_MAX_MESSAGES that expires CHAT_HISTORY_TTL_SECONDS after the
+# last turn; worker memory no longer grows with users x turns.
+
+class ChatHistoryStore:
+    def _key(self, thread_id: str) -> str:
+        return f"chat:history:{thread_id}"
+
+    def compact(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Keep what the next turn needs: the user's question and the final
+        answer. Tool calls, tool output and reflection critiques are dropped.
+        """
+        question = next((m for m in messages if isinstance(m, HumanMessage) and not m.content.startswith("CRITIQUE:")), None)
+        answer = next((m for m in reversed(messages) if isinstance(m, AIMessage) and m.content and not m.tool_calls), None)
+        return [m for m in (question, answer) if m is not None]
+
+    async def load(self, thread_id: str) -> List[BaseMessage]:
+        try:
+            raw = await redis_client.lrange(self._key(thread_id), -settings.CHAT_HISTORY_MAX_MESSAGES, -1)
+        except Exception:
+            # Answer without context rather than fail the chat
+            logger.exception("Could not load chat history")
+            return []
+        return messages_from_dict([json.loads(item) for item in raw])
+
+    async def append(self, thread_id: str, messages: List[BaseMessage]) -> None:
+        """Add one turn, trim the thread to the cap and restart its expiry."""
+        messages = self.compact(messages)
+        if not messages:
+            return
+        key = self._key(thread_id)
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.rpush(key, *[json.dumps(item) for item in messages_to_dict(messages)])
+                pipe.ltrim(key, -settings.CHAT_HISTORY_MAX_MESSAGES, -1)
+                pipe.expire(key, settings.CHAT_HISTORY_TTL_SECONDS)
+                await pipe.execute()
+        except Exception:
+            logger.exception("Could not save chat history")
+
+chat_history = ChatHistoryStore()
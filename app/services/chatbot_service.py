@@ -1,80 +1,171 @@
-import asyncio
+import asyncio, logging, random, weakref
+from collections import Counter
+from contextlib import aclosing
 from rapidfuzz import process
 from app.db.models.user import User
 from langchain_groq import ChatGroq
 from app.core.config import settings
 from langgraph.prebuilt import ToolNode
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-from app.schemas.chatbot import IntentClassification, DecomposedQueries, Reflection
+from app.schemas.chatbot import IntentClassification, IntentClassifications, DecomposedQueries, Reflection
+from app.schemas.chatbot import ChatEvent, ChatToken, ChatToolStart, ChatToolEnd
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import Annotated, Literal, TypedDict, List, AsyncGenerator
+from typing import Annotated, Literal, TypedDict, List, AsyncGenerator, Optional, Tuple
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage, AIMessage, ToolMessage
-from app.services.chatbot_tools import get_chatbot_tools
+from app.services.chatbot_tools import CHATBOT_TOOLS, WRITE_TOOLS, handles_in, remember_handles, tool_failed
+from app.services.chatbot_memory import chat_history
+from app.services.chatbot_intents import IntentClassifier
+from app.services.chatbot_fast_path import chatbot_fast_path
+from app.services.chatbot_cache import response_cache, READ_ONLY_TOOLS
 from app.services.chatbot_instructions import (
     IDEAL_QUERIES,
+    INTENT_EXAMPLES,
     INTENT_PROMPT_TEMPLATE, 
+    BATCH_INTENT_PROMPT_TEMPLATE,
     SYSTEM_PROMPT_TEMPLATE, 
     ENHANCEMENT_AND_DECOMPOSITION_PROMPT,
     REFLECTION_PROMPT_TEMPLATE
 )
 
+logger = logging.getLogger(__name__)
+
+ALL_INTENTS = ["event_query", "booking_query", "general_query", "other"]
+
+OUT_OF_SCOPE = "I am strictly an Event Booking Assistant. I can only assist you with event and booking related tasks."
+TECHNICAL_ISSUE = "I encountered a technical issue. Please try again."
+
+
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
 
+def needs_reflection(messages: List[BaseMessage]) -> bool:
+    """
+    Whether an answer is reflected before it goes out: it changed data, a
+    tool failed, or it used no tool at all (and may have made something up).
+    Successful reads skip the extra LLM round trip.
+    """
+    results = [m for m in messages if isinstance(m, ToolMessage)]
+    return not results or any(m.name in WRITE_TOOLS or tool_failed(m) for m in results)
+
+def is_critique(message: BaseMessage) -> bool:
+    return isinstance(message, HumanMessage) and message.content.startswith("CRITIQUE:")
+
+# Tools each intent may use; general queries get a plain chat graph
+COMMON_TOOLS = ("list_events", "search_events")
+INTENT_TOOLS = {
+    "event_query": COMMON_TOOLS + ("create_event", "update_event", "delete_event", "get_event_attendees"),
+    "booking_query": COMMON_TOOLS + ("create_booking", "get_user_bookings", "cancel_booking"),
+    "general_query": (),
+}
+
 class ChatbotService:
     def __init__(self):
         if not settings.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY is not set in environment or .env file.")
         self.model = ChatGroq(model="llama-3.1-8b-instant", api_key=settings.GROQ_API_KEY, temperature=0.0)
-        self.checkpointer = MemorySaver()
+        self.intent_classifier = self.model.with_structured_output(IntentClassification)
+        self.batch_intent_classifier = self.model.with_structured_output(IntentClassifications)
+        self.enhancer = self.model.with_structured_output(DecomposedQueries)
+        self.reflector = self.model.with_structured_output(Reflection)
+        self._bound_models = {}
+        self.local_intents = IntentClassifier(INTENT_EXAMPLES, settings.INTENT_LOCAL_THRESHOLD, settings.INTENT_LOCAL_MARGIN)
+        # Local hits and LLM fallbacks, and how often the LLM agreed with each,
+        # for this worker; served by GET /admin/chat-stats. Sampled agreement
+        # low: raise INTENT_LOCAL_THRESHOLD. Fallback agreement high: lower it.
+        self.intent_stats = Counter()
+        # Answers reflected or not, critiques, and how the sampled unreflected
+        # answers graded, for this worker; served by GET /admin/chat-stats
+        self.reflection_stats = Counter()
+        self._background = set()
+        # Entries go away once no running chat of that user holds the semaphore
+        self._user_limits = weakref.WeakValueDictionary()
+        # Compiled once; each run passes its session and user in config["configurable"]
+        self.graphs = {intent: self._build_graph(tool_names) for intent, tool_names in INTENT_TOOLS.items()}
 
-    async def detect_intent(self, query: str, user: User) -> str:
-        all_intents = ["event_query", "booking_query", "general_query", "other"]
-        
-        intent_prompt = INTENT_PROMPT_TEMPLATE.format(query=query, all_intents=', '.join(all_intents))
+    def _bound_model(self, tool_names: Tuple[str, ...]):
+        """The chat model with these tools bound, shared by every graph using the same set."""
+        if tool_names not in self._bound_models:
+            tools = [CHATBOT_TOOLS[name] for name in tool_names]
+            self._bound_models[tool_names] = self.model.bind_tools(tools, parallel_tool_calls=True) if tools else self.model
+        return self._bound_models[tool_names]
+
+    async def _llm_intent(self, query: str) -> str:
+        intent_prompt = INTENT_PROMPT_TEMPLATE.format(query=query, all_intents=', '.join(ALL_INTENTS))
         
-        intent_classifier = self.model.with_structured_output(IntentClassification)
         try:
-            intent_result = await intent_classifier.ainvoke([SystemMessage(content=intent_prompt)])
+            intent_result = await self.intent_classifier.ainvoke([SystemMessage(content=intent_prompt)])
             user_intent = intent_result.intent
         except Exception:
             user_intent = "other"
         
-        if user_intent not in all_intents:
+        if user_intent not in ALL_INTENTS:
             user_intent = "other"
         
         return user_intent
 
-    async def query_llm(self, query: str, user: User, user_intent: str, session: AsyncSession) -> str:
-        tool_map = get_chatbot_tools(session, user)
-        common_tools = [tool_map["list_events"], tool_map["search_events"]]
-        
-        if user_intent == "event_query":
-            tools = common_tools + [
-                tool_map["create_event"],
-                tool_map["update_event"],
-                tool_map["delete_event"],
-                tool_map["get_event_attendees"]
-            ]
-        elif user_intent == "booking_query":
-            tools = common_tools + [
-                tool_map["create_booking"],
-                tool_map["get_user_bookings"],
-                tool_map["cancel_booking"]
-            ]
-        else:
-            tools = [] 
+    async def _llm_intents(self, queries: List[str]) -> List[str]:
+        """Classify several sub-queries in one LLM call, or one call each if the answer does not line up."""
+        if len(queries) == 1:
+            return [await self._llm_intent(queries[0])]
+
+        numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(queries, start=1))
+        intent_prompt = BATCH_INTENT_PROMPT_TEMPLATE.format(queries=numbered, all_intents=', '.join(ALL_INTENTS))
+        try:
+            intent_result = await self.batch_intent_classifier.ainvoke([SystemMessage(content=intent_prompt)])
+            intents = intent_result.intents
+        except Exception:
+            intents = []
 
-        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(user_role=user.role.value)
+        if len(intents) != len(queries):
+            return list(await asyncio.gather(*(self._llm_intent(q) for q in queries)))
+        return [intent if intent in ALL_INTENTS else "other" for intent in intents]
 
-        if tools:
-            model_to_use = self.model.bind_tools(tools, parallel_tool_calls=True)
-        else:
-            model_to_use = self.model
+    async def _check_agreement(self, query: str, local_intent: str) -> None:
+        """Ask the LLM anyway for a sample of local hits, to measure their precision."""
+        self.intent_stats["sampled"] += 1
+        self.intent_stats["sampled_agreed"] += local_intent == await self._llm_intent(query)
+
+    def _count_intent(self, source: str, agreed: bool = False) -> None:
+        self.intent_stats[source] += 1
+        self.intent_stats[f"{source}_agreed"] += agreed
+
+    async def detect_intents(self, queries: List[str]) -> List[str]:
+        """
+        Match each sub-query against labelled examples locally; those where no
+        label wins clearly (INTENT_LOCAL_THRESHOLD / INTENT_LOCAL_MARGIN) go
+        to the LLM together in one call.
+        """
+        matches = [self.local_intents.classify(q) for q in queries]
+        intents = []
+        for query, match in zip(queries, matches):
+            if not match.confident:
+                intents.append(None)
+                continue
+            logger.debug("Intent %s from local match (score %.0f, margin %.0f)", match.intent, match.score, match.margin)
+            self._count_intent("local")
+            if random.random() < settings.INTENT_AGREEMENT_SAMPLE_RATE:
+                task = asyncio.create_task(self._check_agreement(query, match.intent))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            intents.append(match.intent)
+
+        unresolved = [i for i, intent in enumerate(intents) if intent is None]
+        if unresolved:
+            llm_intents = await self._llm_intents([queries[i] for i in unresolved])
+            for i, user_intent in zip(unresolved, llm_intents):
+                match = matches[i]
+                logger.debug("Intent %s from LLM; local guess %s (score %.0f, margin %.0f)", user_intent, match.intent, match.score, match.margin)
+                self._count_intent("llm", match.intent == user_intent)
+                intents[i] = user_intent
+        return intents
+
+    def _build_graph(self, tool_names: Tuple[str, ...]):
+        tools = [CHATBOT_TOOLS[name] for name in tool_names]
+        model_to_use = self._bound_model(tool_names)
 
-        async def agent_node(state: AgentState):
+        async def agent_node(state: AgentState, config: RunnableConfig):
             # SAFE CONTEXT PRUNING: Keep max 15 messages to prevent Token Limit Exhaustion
             pruned_msgs = state["messages"]
             if len(pruned_msgs) > 15:
@@ -82,22 +173,23 @@ class ChatbotService:
                 # Guarantee we don't severe a ToolMessage from its parent AIMessage (Causes API Crash)
                 while pruned_msgs and (isinstance(pruned_msgs[0], ToolMessage) or (isinstance(pruned_msgs[0], AIMessage) and getattr(pruned_msgs[0], 'tool_calls', None))):
                     pruned_msgs.pop(0)
-                    
+
+            user = config["configurable"]["user"]
+            system_prompt = SYSTEM_PROMPT_TEMPLATE.format(user_role=user.role.value)
             messages = [SystemMessage(content=system_prompt)] + pruned_msgs
             try:
                 response = await model_to_use.ainvoke(messages)
             except Exception as e:
-                return {"messages": [AIMessage(content="I encountered a technical issue. Please try again.")]}
+                return {"messages": [AIMessage(content=TECHNICAL_ISSUE)]}
             return {"messages": [response]}
 
         async def reflection_node(state: AgentState):
-            reflector = self.model.with_structured_output(Reflection)
             try:
-                critiques = [m for m in state["messages"] if isinstance(m, HumanMessage) and m.content.startswith("CRITIQUE:")]
+                critiques = [m for m in state["messages"] if is_critique(m)]
                 if len(critiques) >= 2:  # Max 2 self-correction attempts logic
                     return {"messages": []}
 
-                res = await reflector.ainvoke(state["messages"] + [SystemMessage(content=REFLECTION_PROMPT_TEMPLATE)])
+                res = await self.reflector.ainvoke(state["messages"] + [SystemMessage(content=REFLECTION_PROMPT_TEMPLATE)])
                 if res.grade != "Pass":
                     return {"messages": [HumanMessage(content=f"CRITIQUE: {res.grade}")]}
                 return {"messages": []}
@@ -109,18 +201,21 @@ class ChatbotService:
         workflow.add_edge(START, "agent")
         
         if tools:
+            # Each tool call opens and closes its own session, so no
+            # connection is held while the agent thinks
             workflow.add_node("tools", ToolNode(tools))
             workflow.add_node("reflection", reflection_node)
             
-            def should_continue(state: AgentState) -> Literal["tools", "reflection"]:
+            def should_continue(state: AgentState) -> Literal["tools", "reflection", END]:
                 last_message = state["messages"][-1]
                 if getattr(last_message, 'tool_calls', None):
                     return "tools"
-                return "reflection"
+                if needs_reflection(state["messages"]):
+                    return "reflection"
+                return END
                 
             def route_after_reflection(state: AgentState) -> Literal["agent", END]:
-                last_msg = state["messages"][-1]
-                if isinstance(last_msg, HumanMessage) and last_msg.content.startswith("CRITIQUE:"):
+                if is_critique(state["messages"][-1]):
                     return "agent"
                 return END
                 
@@ -130,19 +225,91 @@ class ChatbotService:
         else:
             workflow.add_edge("agent", END)
 
-        app = workflow.compile(checkpointer=self.checkpointer)
+        # No checkpointer: history is loaded from and saved to chat_history per turn
+        return workflow.compile()
+
+    async def _grade_in_background(self, messages: List[BaseMessage]) -> None:
+        """Reflect on an answer that was sent unreflected, only to measure how often that goes wrong."""
+        try:
+            res = await self.reflector.ainvoke(messages + [SystemMessage(content=REFLECTION_PROMPT_TEMPLATE)])
+        except Exception:
+            return
+        self.reflection_stats["sampled"] += 1
+        self.reflection_stats["sampled_failed"] += res.grade != "Pass"
+
+    def _count_reflection(self, reflected: bool, critiques: int) -> None:
+        self.reflection_stats["reflected" if reflected else "skipped"] += 1
+        self.reflection_stats["critiques"] += critiques
+
+    async def query_llm(self, query: str, user: User, user_intent: str, session: AsyncSession, run: Optional[dict] = None, history: Optional[List[BaseMessage]] = None) -> AsyncGenerator[ChatEvent, None]:
+        """
+        Stream the agent's answer and its tool calls. If run is given, it
+        receives the names of the tools called under "tools". history is the
+        thread as already loaded by the caller, if it was.
+        """
+        app = self.graphs.get(user_intent, self.graphs["general_query"])
+
+        thread_id = str(user.id)
+        if history is None:
+            history = await chat_history.load(thread_id)
 
         # EXECUTE
-        inputs = {"messages": [HumanMessage(content=query)]}
-        config = {"configurable": {"thread_id": str(user.id)}}
+        inputs = {"messages": history + [HumanMessage(content=query)]}
+        config = {"configurable": {"thread_id": thread_id, "session": session, "user": user}}
+        final_state = None
+        # Only the agent's answer reaches the client: not the reflector's
+        # tokens, and not a turn that ends in tool calls. An answer that will
+        # be reflected (needs_reflection, decided by the tool results so far)
+        # is held until reflection passes it, so a critiqued draft is never
+        # shown; other answers stream as they are generated.
+        results = []
+        held = []
         
-        async for event in app.astream_events(inputs, config=config, version="v2"):
-            kind = event["event"]
-            if kind == "on_chat_model_stream":
-                if "chunk" in event["data"]:
-                    content = event["data"]["chunk"].content
-                    if isinstance(content, str) and content:
-                        yield content
+        # aclosing: if the client goes away, closing this generator stops the
+        # graph at once, including a reflection call in flight
+        async with aclosing(app.astream_events(inputs, config=config, version="v2")) as events:
+            async for event in events:
+                kind = event["event"]
+                node = event["metadata"].get("langgraph_node")
+                if kind == "on_chat_model_stream" and node == "agent":
+                    chunk = event["data"]["chunk"]
+                    content = chunk.content
+                    if chunk.tool_call_chunks or not isinstance(content, str) or not content:
+                        continue
+                    if INTENT_TOOLS.get(user_intent) and needs_reflection(results):
+                        held.append(content)
+                    else:
+                        yield ChatToken(text=content)
+                elif kind == "on_chat_model_end" and node == "agent":
+                    if event["data"]["output"].tool_calls:
+                        held.clear()
+                elif kind == "on_tool_start" and node == "tools":
+                    yield ChatToolStart(tool=event["name"])
+                elif kind == "on_tool_end" and isinstance(event["data"].get("output"), ToolMessage):
+                    results.append(event["data"]["output"])
+                    yield ChatToolEnd(tool=event["name"], ok=not tool_failed(event["data"]["output"]))
+                elif kind == "on_chain_end" and node == "reflection" and event["name"] == "reflection":
+                    messages = event["data"]["output"]["messages"]
+                    if not (messages and is_critique(messages[-1])):
+                        for content in held:
+                            yield ChatToken(text=content)
+                    held.clear()
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    final_state = event["data"]["output"]
+
+        if final_state:
+            turn = final_state["messages"][len(history):]
+            await chat_history.append(thread_id, turn)
+            if run is not None:
+                run["tools"] = {call["name"] for m in turn if isinstance(m, AIMessage) for call in m.tool_calls}
+            if INTENT_TOOLS.get(user_intent):
+                reflected = needs_reflection(turn)
+                self._count_reflection(reflected, sum(is_critique(m) for m in turn))
+                # The answer is out by now; grading it never delays the user
+                if not reflected and random.random() < settings.CHAT_REFLECTION_SAMPLE_RATE:
+                    task = asyncio.create_task(self._grade_in_background(final_state["messages"]))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
 
     async def analyze_and_decompose_query(self, query: str) -> List[str]:
         best_match = process.extractOne(query, IDEAL_QUERIES)
@@ -153,32 +320,97 @@ class ChatbotService:
 
         # Explicitly ask LLM to decompose compound queries, or fix messy text
         enhancement_prompt = ENHANCEMENT_AND_DECOMPOSITION_PROMPT.format(raw_query=query)
-        enhancer = self.model.with_structured_output(DecomposedQueries)
         try:
-            result = await enhancer.ainvoke([SystemMessage(content=enhancement_prompt)])
+            result = await self.enhancer.ainvoke([SystemMessage(content=enhancement_prompt)])
             return [q.lower().strip() for q in result.queries]
         except Exception:
             return [query] # Fallback if API fails
 
-    async def process_query(self, query: str, user: User, session: AsyncSession) -> AsyncGenerator[str, None]:
+    def _user_limit(self, user_id: str) -> asyncio.Semaphore:
+        """Sub-queries one user may have running at once in this worker, across all their chats."""
+        limit = self._user_limits.get(user_id)
+        if limit is None:
+            limit = self._user_limits[user_id] = asyncio.Semaphore(settings.CHAT_MAX_CONCURRENT_SUBQUERIES)
+        return limit
+
+    async def _answer(self, query: str, user_intent: str, user: User, session: AsyncSession, limit: asyncio.Semaphore) -> AsyncGenerator[ChatEvent, None]:
+        if user_intent == "other":
+            yield ChatToken(text=OUT_OF_SCOPE)
+            return
+
+        # Tool-less intents never produce a cacheable answer, so skip the version lookup
+        history = None
+        cache_key = None
+        if INTENT_TOOLS.get(user_intent):
+            history = await chat_history.load(str(user.id))
+            cache_key = await response_cache.key(query, user_intent, user.role.value, history)
+        cached = response_cache.get(cache_key) if cache_key else None
+        # The cached answer's handles must mean the same rows for this user
+        if cached is not None and await remember_handles(user, cached[1]):
+            answer, _ = cached
+            await chat_history.append(str(user.id), [HumanMessage(content=query), AIMessage(content=answer)])
+            yield ChatToken(text=answer)
+            return
+
+        run = {}
+        chunks = []
+        async with limit:
+            async for event in self.query_llm(query, user, user_intent, session, run, history):
+                if isinstance(event, ChatToken):
+                    chunks.append(event.text)
+                yield event
+        if cache_key and run.get("tools") and run["tools"] <= READ_ONLY_TOOLS:
+            answer = "".join(chunks)
+            response_cache.put(cache_key, answer, await handles_in(user, answer))
+
+    async def _answer_into(self, query: str, user_intent: str, user: User, session: AsyncSession, limit: asyncio.Semaphore, out: asyncio.Queue) -> None:
+        """Run one sub-query, pushing its events to out and None when finished."""
+        try:
+            async for event in self._answer(query, user_intent, user, session, limit):
+                await out.put(event)
+        except Exception:
+            logger.exception("Sub-query failed")
+            await out.put(ChatToken(text=TECHNICAL_ISSUE))
+        finally:
+            await out.put(None)
+
+    async def process_query(self, query: str, user: User, session: AsyncSession) -> AsyncGenerator[ChatEvent, None]:
+        reply = await chatbot_fast_path.answer(query, user, session)
+        if reply is not None:
+            yield ChatToken(text=reply)
+            return
+
         clean_queries = await self.analyze_and_decompose_query(query)
 
-        for i, q in enumerate(clean_queries):
-            if i > 0:
-                yield "\n\n"
-                
-            if q == "other":
-                yield "I am strictly an Event Booking Assistant. I can only assist you with event and booking related tasks."
-                continue
-                
-            user_intent = await self.detect_intent(q, user)
-            print(f"Sub-Query: '{q}' -> Intent: {user_intent}")
-            
-            if user_intent == "other":
-                yield "I am strictly an Event Booking Assistant. I can only assist you with event and booking related tasks."
-                continue
-                
-            async for chunk in self.query_llm(q, user, user_intent, session):
-                yield chunk
+        # The decomposer marks unrelated parts "other" itself
+        to_classify = [q for q in clean_queries if q != "other"]
+        detected = iter(await self.detect_intents(to_classify) if to_classify else [])
+        intents = ["other" if q == "other" else next(detected) for q in clean_queries]
+
+        limit = self._user_limit(str(user.id))
+        if len(clean_queries) == 1:
+            async for event in self._answer(clean_queries[0], intents[0], user, session, limit):
+                yield event
+            return
+
+        # Sub-queries run concurrently; their tools query through sessions of
+        # their own. The first streams live; later ones buffer and are
+        # flushed in order once everything before them is out.
+        queues = [asyncio.Queue() for _ in clean_queries]
+        tasks = [
+            asyncio.create_task(self._answer_into(q, user_intent, user, session, limit, queue))
+            for q, user_intent, queue in zip(clean_queries, intents, queues)
+        ]
+        try:
+            for i, queue in enumerate(queues):
+                if i > 0:
+                    yield ChatToken(text="\n\n")
+                while (event := await queue.get()) is not None:
+                    yield event
+        finally:
+            # Client gone or stream finished: stop whatever is still running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
 chatbot_service = ChatbotService()
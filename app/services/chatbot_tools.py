@@ -1,37 +1,221 @@
-import json
+import json, logging, re
 from uuid import UUID
-from typing import Optional
+from collections import Counter, defaultdict
+from typing import AsyncIterator, DefaultDict, Dict, Iterable, List, Optional, Sequence, Tuple
+from contextlib import asynccontextmanager
 from datetime import datetime
 from app.db.models.user import User
 from langchain_core.tools import tool
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
 from app.services.event_service import event_service
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.services.booking_service import booking_service
 from app.schemas.event import EventCreateRequest, EventUpdateRequest
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.db.async_session import async_session
 
-def get_chatbot_tools(session: AsyncSession, user: User):
-    
-    @tool
-    async def list_events() -> str:
-        """
-        List all events.
-        """
+logger = logging.getLogger(__name__)
+
+# The tools are defined once and shared by every chat; the request's session
+# and user travel in config["configurable"], which LangChain hands to any tool
+# taking a RunnableConfig (the argument stays out of the schema the model sees).
+# Tools query through their own sessions (see _session).
+
+def _context(config: RunnableConfig) -> Tuple[AsyncSession, User]:
+    """The request's session and user."""
+    configurable = config["configurable"]
+    return configurable["session"], configurable["user"]
+
+@asynccontextmanager
+async def _session(config: RunnableConfig) -> AsyncIterator[AsyncSession]:
+    """
+    A session of its own for each tool call. The model may call several tools
+    at once and ToolNode runs them concurrently, which one shared session
+    cannot serve; this also keeps each write tool in its own transaction and
+    holds a connection only for the duration of the call.
+    """
+    request_session, _ = _context(config)
+    async with async_session() as session:
+        # Lets commits made here pin the user to the primary
+        session.info["user_id"] = request_session.info.get("user_id")
+        yield session
+
+# Tool results go back into the prompt on every agent step, so they are kept
+# small: only the columns the agent acts on, one pipe-separated line per row,
+# descriptions cut short, and short row handles ("E3f9a1c") instead of UUIDs.
+# Handles are remembered per user for as long as the chat history, so one
+# seen in an earlier answer still resolves on the next turn. A handle is
+# never repointed: a row whose tail is already taken by another row gets a
+# longer one.
+
+HANDLE_CHARS = 6
+HANDLE_PATTERN = re.compile(rf"\b[EB][0-9a-f]{{{HANDLE_CHARS},32}}\b")
+# Claims lost to a concurrent tool call before giving up and using full ids
+HANDLE_ATTEMPTS = 3
+DESCRIPTION_CHARS = 60
+BOOKINGS_LIMIT = 50
+
+def _handles_key(user: User) -> str:
+    return f"chat:handles:{user.id}"
+
+def _handle(prefix: str, row_id: UUID, length: int = HANDLE_CHARS) -> str:
+    # The tail: random in both uuid4 and uuid7, whose head is a timestamp
+    return f"{prefix}{row_id.hex[-length:]}"
+
+async def assign_handles(user: User, rows: Sequence[Tuple[str, UUID]]) -> List[str]:
+    """
+    A handle for each (prefix, row id), lengthened past any handle the user
+    already has for another row. Without Redis the full ids are returned,
+    which the tools accept as well.
+    """
+    key = _handles_key(user)
+    pending = list(dict.fromkeys(rows))
+    assigned: Dict[Tuple[str, UUID], str] = {}
+    try:
+        for _ in range(HANDLE_ATTEMPTS):
+            taken = {handle.decode(): UUID(row_id.decode()) for handle, row_id in (await redis_client.hgetall(key)).items()}
+            claims = {}
+            for prefix, row_id in pending:
+                length = HANDLE_CHARS
+                while taken.get(_handle(prefix, row_id, length), row_id) != row_id:
+                    length += 2
+                handle = _handle(prefix, row_id, length)
+                taken[handle] = row_id
+                claims[(prefix, row_id)] = handle
+
+            # HSETNX: a concurrent tool call may have claimed a handle since HGETALL
+            async with redis_client.pipeline(transaction=True) as pipe:
+                for (_, row_id), handle in claims.items():
+                    pipe.hsetnx(key, handle, str(row_id))
+                pipe.hmget(key, list(claims.values()))
+                pipe.expire(key, settings.CHAT_HISTORY_TTL_SECONDS)
+                results = await pipe.execute()
+            stored = results[-2]
+            pending = []
+            for (row, handle), row_id in zip(claims.items(), stored):
+                if row_id is not None and UUID(row_id.decode()) == row[1]:
+                    assigned[row] = handle
+                else:
+                    pending.append(row)
+            if not pending:
+                break
+    except Exception:
+        logger.exception("Could not save tool handles")
+    return [assigned.get(row, str(row[1])) for row in rows]
+
+async def remember_handles(user: User, handles: Dict[str, UUID]) -> bool:
+    """
+    Bind handles taken from a cached answer to this user. False if one of
+    them already points at another of the user's rows (or Redis is down),
+    in which case the answer cannot be reused for them.
+    """
+    if not handles:
+        return True
+    key = _handles_key(user)
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            for handle, row_id in handles.items():
+                pipe.hsetnx(key, handle, str(row_id))
+            pipe.hmget(key, list(handles))
+            pipe.expire(key, settings.CHAT_HISTORY_TTL_SECONDS)
+            results = await pipe.execute()
+    except Exception:
+        logger.exception("Could not save tool handles")
+        return False
+    return all(row_id is not None and UUID(row_id.decode()) == expected for row_id, expected in zip(results[-2], handles.values()))
+
+async def handles_in(user: User, text: str) -> Dict[str, UUID]:
+    """The user's handles that appear in text, e.g. to carry them along with a cached answer."""
+    found = sorted(set(HANDLE_PATTERN.findall(text)))
+    if not found:
+        return {}
+    try:
+        row_ids = await redis_client.hmget(_handles_key(user), found)
+    except Exception:
+        return {}
+    return {handle: UUID(row_id.decode()) for handle, row_id in zip(found, row_ids) if row_id is not None}
+
+async def _assign(config: RunnableConfig, rows: Sequence[Tuple[str, UUID]]) -> List[str]:
+    _, user = _context(config)
+    return await assign_handles(user, rows)
+
+async def _resolve(config: RunnableConfig, value: str) -> UUID:
+    """A row id from a handle given in an earlier tool result, or from a full UUID."""
+    value = value.strip()
+    try:
+        return UUID(value)
+    except ValueError:
+        pass
+    _, user = _context(config)
+    row_id = await redis_client.hget(_handles_key(user), value)
+    if row_id is None:
+        raise ValueError(f"Unknown id '{value}'; look it up again with a search or list tool")
+    return UUID(row_id.decode())
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return f"{value:%Y-%m-%d %H:%M}"
+    return str(value).replace("|", "/").replace("\n", " ")
+
+def _table(columns: Sequence[str], rows: Iterable[Sequence]) -> str:
+    return "\n".join(["|".join(columns)] + ["|".join(_cell(value) for value in row) for row in rows])
+
+def _truncate(text: str, limit: int = DESCRIPTION_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+# Per tool: calls, rows, tokens and json_tokens (what the same rows would
+# have cost as JSON), for this worker; served by GET /admin/chat-stats
+tool_stats: DefaultDict[str, Counter] = defaultdict(Counter)
+
+def _count_tokens(text: str) -> int:
+    # ~4 characters a token; the model is Llama, so any tokenizer here would
+    # be an estimate anyway, and this one is enough to compare encodings
+    return max(1, len(text) // 4)
+
+def _report(tool_name: str, compact: str, rows: List, verbose) -> None:
+    """Count the tokens a result costs against the JSON it replaced, to track the savings."""
+    stats = tool_stats[tool_name]
+    stats["calls"] += 1
+    stats["rows"] += len(rows)
+    stats["tokens"] += _count_tokens(compact)
+    stats["json_tokens"] += _count_tokens(json.dumps(verbose(rows)))
+
+async def _events_table(config: RunnableConfig, tool_name: str, events: List) -> str:
+    handles = await _assign(config, [("E", e.id) for e in events])
+    compact = _table(
+        ("id", "title", "date", "location", "seats_left", "description"),
+        ((handle, e.title, e.date, e.location, max(e.capacity - e.booked_seats, 0), _truncate(e.description)) for handle, e in zip(handles, events)),
+    )
+    _report(tool_name, compact, events, lambda rows: [e.model_dump(mode="json") for e in rows])
+    return compact
+
+@tool
+async def list_events(config: RunnableConfig) -> str:
+    """
+    List all events.
+    """
+    async with _session(config) as session:
         try:
             events = await event_service.get_all_events(session)
-            return json.dumps([e.model_dump(mode="json") for e in events])
+            return await _events_table(config, "list_events", events)
         except Exception as e:
             return f"Failed to list events: {str(e)}"
 
-    @tool
-    async def search_events(query: Optional[str] = None, location: Optional[str] = None, date: Optional[str] = None, upcoming_only: bool = True) -> str:
-        """
-        Search for events by title, description, location, or date.
-        Args:
-            query: Keywords to search in title/description (e.g., "Rock Concert", "Workshop").
-            location: Filter by city or venue (e.g., "New York").
-            date: Filter by specific date (YYYY-MM-DD).
-            upcoming_only: Defaults to True. Set to False to include past events.
-        """
+@tool
+async def search_events(config: RunnableConfig, query: Optional[str] = None, location: Optional[str] = None, date: Optional[str] = None, upcoming_only: bool = True) -> str:
+    """
+    Search for events by title, description, location, or date.
+    Args:
+        query: Keywords to search in title/description (e.g., "Rock Concert", "Workshop").
+        location: Filter by city or venue (e.g., "New York").
+        date: Filter by specific date (YYYY-MM-DD).
+        upcoming_only: Defaults to True. Set to False to include past events.
+    """
+    async with _session(config) as session:
         try:
             date_start = None
             date_end = None
@@ -53,25 +237,27 @@ def get_chatbot_tools(session: AsyncSession, user: User):
                 upcoming_only=upcoming_only,
                 limit=10 
             )
-            
+        
             if not events:
                 return "No events found matching this criteria. You MUST reply 'I do not have that information' and you are FORBIDDEN from guessing an event."
-                
-            return json.dumps([e.model_dump(mode="json") for e in events])
+            
+            return await _events_table(config, "search_events", events)
         except Exception as e:
             return f"Search failed: {str(e)}"
 
-    @tool
-    async def create_event(title: str, description: str, date: str, location: str, capacity: int) -> str:
-        """
-        Create a new event
-        Args:
-            title: Event title.
-            description: Event description.
-            date: ISO format date string (YYYY-MM-DDTHH:MM:SS)
-            location: Venue location.
-            capacity: Max number of attendees.
-        """
+@tool
+async def create_event(config: RunnableConfig, title: str, description: str, date: str, location: str, capacity: int) -> str:
+    """
+    Create a new event
+    Args:
+        title: Event title.
+        description: Event description.
+        date: ISO format date string (YYYY-MM-DDTHH:MM:SS)
+        location: Venue location.
+        capacity: Max number of attendees.
+    """
+    _, user = _context(config)
+    async with _session(config) as session:
         try:
             # Basic parsing, might need more robust handling
             event_date = datetime.fromisoformat(date)
@@ -83,29 +269,32 @@ def get_chatbot_tools(session: AsyncSession, user: User):
                 capacity=capacity
             )
             new_event = await event_service.create_event(session, event_data, user)
-            return f"Event created successfully! ID: {new_event.id}"
+            handle, = await _assign(config, [("E", new_event.id)])
+            return f"Event created successfully! ID: {handle}"
         except ValueError as e:
             return f"Invalid data format: {str(e)}"
         except Exception as e:
             return f"Creation failed: {str(e)}"
 
-    @tool
-    async def update_event(event_id: str, title: str = None, description: str = None, date: str = None, location: str = None, capacity: int = None) -> str:
-        """
-        Update an existing event. If you do not know the event_id, call search_events or list_events first to find it.
-        Args:
-            event_id: UUID of the event.
-            title: New title (optional).
-            description: New description (optional).
-            date: New date (ISO format) (optional).
-            location: New location (optional).
-            capacity: New capacity (optional).
-        """
+@tool
+async def update_event(config: RunnableConfig, event_id: str, title: str = None, description: str = None, date: str = None, location: str = None, capacity: int = None) -> str:
+    """
+    Update an existing event. If you do not know the event_id, call search_events or list_events first to find it.
+    Args:
+        event_id: ID of the event (the id column of search_events or list_events).
+        title: New title (optional).
+        description: New description (optional).
+        date: New date (ISO format) (optional).
+        location: New location (optional).
+        capacity: New capacity (optional).
+    """
+    _, user = _context(config)
+    async with _session(config) as session:
         try:
-            event = await event_service.get_event_by_id(session, UUID(event_id))
+            event = await event_service.get_event_by_id(session, await _resolve(config, event_id))
             if not event:
                 return "Event not found."
-            
+        
             if event.organizer_id != user.id:
                     return "Error: You can only update events you created."
 
@@ -117,29 +306,32 @@ def get_chatbot_tools(session: AsyncSession, user: User):
             }
             # Remove None values so they don't overwrite existing data
             update_kwargs = {k: v for k, v in update_kwargs.items() if v is not None}
-            
+        
             if date:
                 update_kwargs["date"] = datetime.fromisoformat(date)
-                
+            
             update_data = EventUpdateRequest(**update_kwargs)
-                
+            
             updated_event = await event_service.update_event(session, event, update_data)
-            return f"Event updated successfully! ID: {updated_event.id}"
+            handle, = await _assign(config, [("E", updated_event.id)])
+            return f"Event updated successfully! ID: {handle}"
         except Exception as e:
             return f"Update failed: {str(e)}"
 
-    @tool
-    async def delete_event(event_id: str) -> str:
-        """
-        Delete an event. If you do not know the event_id, call search_events or list_events first to find it.
-        Args:
-            event_id: UUID of the event.
-        """
+@tool
+async def delete_event(config: RunnableConfig, event_id: str) -> str:
+    """
+    Delete an event. If you do not know the event_id, call search_events or list_events first to find it.
+    Args:
+        event_id: ID of the event (the id column of search_events or list_events).
+    """
+    _, user = _context(config)
+    async with _session(config) as session:
         try:
-            event = await event_service.get_event_by_id(session, UUID(event_id))
+            event = await event_service.get_event_by_id(session, await _resolve(config, event_id))
             if not event:
                 return "Event not found."
-            
+        
             if event.organizer_id != user.id:
                     return "Error: You can only delete events you created."
 
@@ -148,68 +340,98 @@ def get_chatbot_tools(session: AsyncSession, user: User):
         except Exception as e:
             return f"Delete failed: {str(e)}"
 
-    @tool
-    async def create_booking(event_id: str) -> str:
-        """
-        Book a ticket for an event.
-        Args:
-            event_id: The UUID of the event to book.
-        """
+@tool
+async def create_booking(config: RunnableConfig, event_id: str) -> str:
+    """
+    Book a ticket for an event.
+    Args:
+        event_id: ID of the event to book (the id column of search_events or list_events).
+    """
+    _, user = _context(config)
+    async with _session(config) as session:
         try:
-            booking = await booking_service.create_booking(session, user.id, UUID(event_id))
-            return f"Booking successful! Booking ID: {booking.id}"
+            booking = await booking_service.create_booking(session, user.id, await _resolve(config, event_id))
+            handle, = await _assign(config, [("B", booking.id)])
+            return f"Booking successful! Booking ID: {handle}"
         except Exception as e:
             return f"Booking failed: {str(e)}"
 
-    @tool
-    async def get_user_bookings() -> str:
-        """
-        Show the current user's bookings.
-        """
-        bookings = await booking_service.get_user_bookings(session, user.id)
-        return json.dumps([b.model_dump(mode="json") for b in bookings])
-
-    @tool
-    async def cancel_booking(booking_id: str) -> str:
-        """
-        Cancel a booking. If you do not know the booking_id, call get_user_bookings first to find it.
-        Args:
-            booking_id: UUID of the booking.
-        """
+@tool
+async def get_user_bookings(config: RunnableConfig) -> str:
+    """
+    Show the current user's bookings.
+    """
+    _, user = _context(config)
+    async with _session(config) as session:
+        bookings = await booking_service.get_user_bookings(session, user.id, limit=BOOKINGS_LIMIT)
+        if not bookings:
+            return "The user has no bookings."
+        titles = await event_service.get_event_titles(session, [b.event_id for b in bookings])
+        handles = await _assign(config, [("B", b.id) for b in bookings] + [("E", b.event_id) for b in bookings])
+        compact = _table(
+            ("id", "event_id", "event", "status", "booked_on"),
+            ((handle, event_handle, titles.get(b.event_id, ""), b.status, b.booking_date) for handle, event_handle, b in zip(handles, handles[len(bookings):], bookings)),
+        )
+        _report("get_user_bookings", compact, bookings, lambda rows: [b.model_dump(mode="json") for b in rows])
+        return compact
+
+@tool
+async def cancel_booking(config: RunnableConfig, booking_id: str) -> str:
+    """
+    Cancel a booking. If you do not know the booking_id, call get_user_bookings first to find it.
+    Args:
+        booking_id: ID of the booking (the id column of get_user_bookings).
+    """
+    _, user = _context(config)
+    async with _session(config) as session:
         try:
-            await booking_service.cancel_booking(session, UUID(booking_id), user)
+            await booking_service.cancel_booking(session, await _resolve(config, booking_id), user)
             return "Booking cancelled successfully."
         except Exception as e:
             return f"Cancellation failed: {str(e)}"
 
-    @tool
-    async def get_event_attendees(event_id: str) -> str:
-        """
-        Get list of attendees for an event. If you do not know the event_id, call search_events or list_events first to find it.
-        Args:
-            event_id: UUID of the event.
-        """
+@tool
+async def get_event_attendees(config: RunnableConfig, event_id: str) -> str:
+    """
+    Get list of attendees for an event. If you do not know the event_id, call search_events or list_events first to find it.
+    Args:
+        event_id: ID of the event (the id column of search_events or list_events).
+    """
+    _, user = _context(config)
+    async with _session(config) as session:
         try:
-            event = await event_service.get_event_by_id(session, UUID(event_id))
+            event = await event_service.get_event_by_id(session, await _resolve(config, event_id))
             if not event:
                 return "Event not found."
-                
+            
             if event.organizer_id != user.id:
                 return "Error: You can only view attendees for your own events."
 
-            attendees = await booking_service.get_event_attendees(session, UUID(event_id))
-            return json.dumps([{"id": str(u.id), "email": u.email} for u in attendees])
+            attendees = await booking_service.get_event_attendees(session, event.id)
+            return _table(("email",), ((u.email,) for u in attendees))
         except Exception as e:
             return f"Failed to fetch attendees: {str(e)}"
 
-    return {
-        "list_events": list_events,
-        "search_events": search_events,
-        "create_event": create_event,
-        "update_event": update_event,
-        "delete_event": delete_event,
-        "create_booking": create_booking,
-        "get_user_bookings": get_user_bookings,
-        "cancel_booking": cancel_booking,
-        "get_event_attendees": get_event_attendees
-    }
+# By name; the service picks the set each intent may use
+CHATBOT_TOOLS = {
+    t.name: t for t in [
+        list_events,
+        search_events,
+        create_event,
+        update_event,
+        delete_event,
+        create_booking,
+        get_user_bookings,
+        cancel_booking,
+        get_event_attendees,
+    ]
+}
+
+# Tools that change data; answers built on them are always reflected
+WRITE_TOOLS = frozenset({"create_event", "update_event", "delete_event", "create_booking", "cancel_booking"})
+
+# Tools report failures as text so the agent can recover from them
+_FAILURE_PATTERN = re.compile(r"^(Error:|Invalid |Failed |\w+ failed:|Event not found)")
+
+def tool_failed(message: ToolMessage) -> bool:
+    return message.status == "error" or bool(_FAILURE_PATTERN.match(str(message.content)))
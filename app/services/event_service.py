@@ -1,20 +1,69 @@
-from typing import List, Optional
-from sqlalchemy import or_
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from sqlalchemy import or_, union_all, literal_column, tuple_, text
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi import HTTPException, status
 from app.db.models.event import Event
 from app.db.models.user import User
-from app.schemas.event import EventCreateRequest, EventUpdateRequest
+from app.db.models.archive import EventArchive
+from app.core.config import settings
+from app.core.redis import bump_events_version
+from app.db.async_session import mark_written
+from app.schemas.event import EventCreateRequest, EventUpdateRequest, EventImportError
+
+# Valid rows are copied here in batches, then merged into event in one statement
+IMPORT_COLUMNS = ["line", "id", "title", "description", "date", "location", "capacity"]
+IMPORT_COPY_BATCH = 1000
+
+CREATE_EVENT_IMPORT = text("""
+CREATE TEMP TABLE event_import (
+    line integer NOT NULL,
+    id uuid NOT NULL,
+    title text NOT NULL,
+    description text NOT NULL,
+    date timestamp NOT NULL,
+    location text NOT NULL,
+    capacity integer NOT NULL
+) ON COMMIT DROP
+""")
+
+# Skips rows repeated within the file and rows the organizer already has,
+# inserts the rest, and returns the skipped lines for the error report.
+MERGE_EVENT_IMPORT = text("""
+WITH staged AS (
+    SELECT s.*,
+           row_number() OVER (PARTITION BY s.title, s.date, s.location ORDER BY s.line) > 1 AS repeated,
+           EXISTS (
+               SELECT 1 FROM event e
+               WHERE e.organizer_id = :organizer_id
+                 AND e.date = s.date
+                 AND e.title = s.title
+                 AND e.location = s.location
+                 AND e.deleted_at IS NULL
+           ) AS existing
+    FROM event_import s
+), inserted AS (
+    INSERT INTO event (id, title, description, date, location, capacity, booked_seats, organizer_id)
+    SELECT id, title, description, date, location, capacity, 0, :organizer_id
+    FROM staged
+    WHERE NOT repeated AND NOT existing
+)
+SELECT line, repeated, existing FROM staged WHERE repeated OR existing
+""")
 
 class EventService:
     async def get_event_by_id(self, session: AsyncSession, event_id: UUID) -> Optional[Event]:
-        return await session.get(Event, event_id)
+        event = await session.get(Event, event_id)
+        if event is None or event.deleted_at is not None:
+            return None
+        return event
         
     async def get_all_events(self, session: AsyncSession, skip: int = 0, limit: int = 20, upcoming_only: bool = True) -> List[Event]:
-        statement = select(Event)
+        statement = select(Event).where(Event.deleted_at.is_(None))
         if upcoming_only:
             # Use naive UTC time for comparison because DB stores naive timestamps
             statement = statement.where(Event.date > datetime.utcnow())
@@ -22,8 +71,20 @@ class EventService:
         result = await session.exec(statement)
         return result.all()
 
+    async def get_event_titles(self, session: AsyncSession, event_ids: Iterable[UUID]) -> Dict[UUID, str]:
+        """Titles by id for live and archived events, e.g. to label a list of bookings."""
+        event_ids = list(set(event_ids))
+        if not event_ids:
+            return {}
+        statement = union_all(
+            select(Event.id, Event.title).where(Event.id.in_(event_ids)),
+            select(EventArchive.id, EventArchive.title).where(EventArchive.id.in_(event_ids)),
+        )
+        result = await session.execute(statement)
+        return {row.id: row.title for row in result}
+
     async def search_events(self, session: AsyncSession, query: Optional[str] = None, location: Optional[str] = None, date_start: Optional[datetime] = None, date_end: Optional[datetime] = None, upcoming_only: bool = True, limit: int = 20) -> List[Event]:
-        statement = select(Event)
+        statement = select(Event).where(Event.deleted_at.is_(None))
         
         # Default to upcoming only unless specific dates are requested
         if upcoming_only and not date_start and not date_end:
@@ -51,6 +112,22 @@ class EventService:
         result = await session.exec(statement)
         return result.all()
     
+    async def get_organizer_events(self, session: AsyncSession, organizer_id: UUID, after: Optional[Tuple[datetime, UUID]] = None, limit: int = 20) -> List:
+        """Latest first, live and archived events of an organizer that sort after the (date, id) key."""
+        branches = []
+        for model in (Event, EventArchive):
+            statement = select(model.id, model.title, model.description, model.date, model.location, model.capacity, model.booked_seats, model.organizer_id).where(model.organizer_id == organizer_id)
+            if model is Event:
+                statement = statement.where(Event.deleted_at.is_(None))
+            if after:
+                statement = statement.where(tuple_(model.date, model.id) < after)
+            statement = statement.order_by(model.date.desc(), model.id.desc()).limit(limit)
+            branches.append(select(statement.subquery()))
+
+        statement = union_all(*branches).order_by(literal_column("date").desc(), literal_column("id").desc()).limit(limit)
+        result = await session.execute(statement)
+        return result.all()
+
     async def create_event(self, session: AsyncSession, event_data: EventCreateRequest, organizer: User) -> Event:
         # Check for duplicate event by the same organizer
         existing_event = await session.exec(
@@ -58,7 +135,8 @@ class EventService:
                 Event.title == event_data.title,
                 Event.date == event_data.date,
                 Event.location == event_data.location,
-                Event.organizer_id == organizer.id
+                Event.organizer_id == organizer.id,
+                Event.deleted_at.is_(None)
             )
         )
         if existing_event.first():
@@ -78,9 +156,65 @@ class EventService:
         )
         session.add(new_event)
         await session.commit()
+        await bump_events_version()
         await session.refresh(new_event)
         return new_event
         
+    async def import_events(self, session: AsyncSession, rows: Iterable[Tuple[int, Union[dict, str]]], organizer: User) -> Tuple[int, List[EventImportError]]:
+        """
+        Validate uploaded rows one at a time, COPY the valid ones into a staging
+        table and merge them into event in a single statement. Nothing is
+        written unless the whole file is processed. Returns (imported, errors).
+        """
+        errors = []
+        staged = 0
+        batch = []
+
+        await session.execute(CREATE_EVENT_IMPORT)
+        connection = await session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+
+        async def copy_batch():
+            await driver_connection.copy_records_to_table("event_import", records=batch, columns=IMPORT_COLUMNS)
+
+        for count, (line, data) in enumerate(rows, start=1):
+            if count > settings.EVENT_IMPORT_MAX_ROWS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Imports are limited to {settings.EVENT_IMPORT_MAX_ROWS} rows"
+                )
+            if isinstance(data, str):
+                errors.append(EventImportError(line=line, errors=[data]))
+                continue
+            try:
+                event = EventCreateRequest.model_validate(data)
+            except ValidationError as e:
+                errors.append(EventImportError(line=line, errors=[
+                    f"{'.'.join(str(loc) for loc in error['loc']) or 'row'}: {error['msg']}" for error in e.errors()
+                ]))
+                continue
+
+            staged += 1
+            batch.append((line, uuid.uuid7(), event.title, event.description, event.date, event.location, event.capacity))
+            if len(batch) >= IMPORT_COPY_BATCH:
+                await copy_batch()
+                batch = []
+        if batch:
+            await copy_batch()
+
+        skipped = (await session.execute(MERGE_EVENT_IMPORT, {"organizer_id": organizer.id})).all()
+        for row in skipped:
+            reason = "Duplicate of an earlier row in this file" if row.repeated else "You have already created an event with this title, date, and location."
+            errors.append(EventImportError(line=row.line, errors=[reason]))
+
+        # COPY and the text() merge bypass the ORM write tracking
+        mark_written(session)
+        await session.commit()
+        await bump_events_version()
+
+        errors.sort(key=lambda error: error.line)
+        return staged - len(skipped), errors
+
     async def update_event(self, session: AsyncSession, event: Event, update_data: EventUpdateRequest) -> Event:
         event_data = update_data.model_dump(exclude_unset=True)
         for key, value in event_data.items():
@@ -88,11 +222,15 @@ class EventService:
             
         session.add(event)
         await session.commit()
+        await bump_events_version()
         await session.refresh(event)
         return event
 
     async def delete_event(self, session: AsyncSession, event: Event):
-        await session.delete(event)
+        # Soft delete: hidden from now on, bookings are removed by PurgeService
+        event.deleted_at = datetime.now(timezone.utc)
+        session.add(event)
         await session.commit()
+        await bump_events_version()
 
 event_service = EventService()
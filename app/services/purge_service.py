@@ -0,0 +1,163 @@
+import asyncio, logging
+from uuid import UUID
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import bump_events_version
+from app.db.models.event import Event
+from app.db.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Deleting a user or event only sets deleted_at. The rows hanging off it are
+# removed here in bounded batches, one short transaction each, so a large
+# organizer never turns into a single huge cascade holding thousands of locks.
+
+DELETE_EVENT_BOOKINGS_BATCH = text("""
+DELETE FROM booking WHERE id IN (
+    SELECT id FROM booking WHERE event_id = :event_id LIMIT :batch_size
+)
+""")
+
+DELETE_EVENT_ARCHIVED_BOOKINGS_BATCH = text("""
+DELETE FROM booking_archive WHERE id IN (
+    SELECT id FROM booking_archive WHERE event_id = :event_id LIMIT :batch_size
+)
+""")
+
+# Gives the seats of confirmed bookings back to events that stay live
+DELETE_USER_BOOKINGS_BATCH = text("""
+WITH gone AS (
+    DELETE FROM booking WHERE id IN (
+        SELECT id FROM booking WHERE user_id = :user_id LIMIT :batch_size
+    )
+    RETURNING event_id, status
+), released AS (
+    SELECT event_id, count(*) AS seats FROM gone
+    WHERE status = 'confirmed'
+    GROUP BY event_id
+), seats AS (
+    UPDATE event SET booked_seats = GREATEST(0, event.booked_seats - released.seats)
+    FROM released
+    WHERE event.id = released.event_id
+)
+SELECT count(*) FROM gone
+""")
+
+DELETE_USER_ARCHIVED_BOOKINGS_BATCH = text("""
+DELETE FROM booking_archive WHERE id IN (
+    SELECT id FROM booking_archive WHERE user_id = :user_id LIMIT :batch_size
+)
+""")
+
+# Archived bookings have no FK to event_archive, so clear them before their events
+DELETE_USER_ARCHIVED_EVENTS_BATCH = text("""
+WITH ev AS (
+    SELECT id FROM event_archive WHERE organizer_id = :user_id LIMIT :batch_size
+), bookings AS (
+    DELETE FROM booking_archive WHERE event_id IN (SELECT id FROM ev)
+)
+DELETE FROM event_archive WHERE id IN (SELECT id FROM ev)
+""")
+
+MARK_USER_EVENTS_DELETED_BATCH = text("""
+UPDATE event SET deleted_at = now() WHERE id IN (
+    SELECT id FROM event WHERE organizer_id = :user_id AND deleted_at IS NULL LIMIT :batch_size
+)
+""")
+
+class PurgeService:
+    async def _drain(self, session: AsyncSession, statement, params: dict, batch_size: int) -> int:
+        """Run a batched statement until it affects fewer rows than a full batch."""
+        total = 0
+        while True:
+            result = await session.execute(statement, {**params, "batch_size": batch_size})
+            moved = result.scalar_one() if result.returns_rows else result.rowcount
+            await session.commit()
+            total += moved
+            if moved < batch_size:
+                return total
+
+    async def purge_event(self, session: AsyncSession, event_id: UUID, batch_size: int) -> int:
+        """Delete a soft-deleted event's bookings in batches, then the event itself."""
+        params = {"event_id": event_id}
+        bookings = await self._drain(session, DELETE_EVENT_BOOKINGS_BATCH, params, batch_size)
+        bookings += await self._drain(session, DELETE_EVENT_ARCHIVED_BOOKINGS_BATCH, params, batch_size)
+        await session.execute(text("DELETE FROM event WHERE id = :event_id"), params)
+        await session.commit()
+        return bookings
+
+    async def purge_user(self, session: AsyncSession, user_id: UUID, batch_size: int) -> int:
+        """Remove a soft-deleted user's events, bookings and archived rows in batches, then the user."""
+        params = {"user_id": user_id}
+        # Hide any events still listed under the user before tearing them down
+        if await self._drain(session, MARK_USER_EVENTS_DELETED_BATCH, params, batch_size):
+            await bump_events_version()
+
+        events = 0
+        while True:
+            event_ids = (await session.exec(
+                select(Event.id).where(Event.organizer_id == user_id).limit(batch_size)
+            )).all()
+            for event_id in event_ids:
+                await self.purge_event(session, event_id, batch_size)
+            events += len(event_ids)
+            if len(event_ids) < batch_size:
+                break
+
+        # Gives seats back to live events, so cached answers about them go stale
+        if await self._drain(session, DELETE_USER_BOOKINGS_BATCH, params, batch_size):
+            await bump_events_version()
+        await self._drain(session, DELETE_USER_ARCHIVED_BOOKINGS_BATCH, params, batch_size)
+        events += await self._drain(session, DELETE_USER_ARCHIVED_EVENTS_BATCH, params, batch_size)
+
+        # Nothing references the row any more, so this no longer cascades
+        await session.execute(text('DELETE FROM "user" WHERE id = :user_id'), params)
+        await session.commit()
+        return events
+
+    async def purge_user_by_id(self, user_id: UUID) -> None:
+        """Background-task entry point; uses its own session since the request's is closed."""
+        from app.db.async_session import async_session
+        async with async_session() as session:
+            await self.purge_user(session, user_id, settings.PURGE_BATCH_SIZE)
+
+    async def purge_event_by_id(self, event_id: UUID) -> None:
+        """Background-task entry point; uses its own session since the request's is closed."""
+        from app.db.async_session import async_session
+        async with async_session() as session:
+            await self.purge_event(session, event_id, settings.PURGE_BATCH_SIZE)
+
+    async def run(self, session: AsyncSession) -> dict:
+        """Purge everything that is soft-deleted, e.g. left behind by a failed background task."""
+        batch_size = settings.PURGE_BATCH_SIZE
+        totals = {"users": 0, "events": 0}
+
+        # Users first; their events are handled as part of the user
+        user_ids = (await session.exec(select(User.id).where(User.deleted_at.is_not(None)))).all()
+        for user_id in user_ids:
+            totals["events"] += await self.purge_user(session, user_id, batch_size)
+            totals["users"] += 1
+
+        event_ids = (await session.exec(select(Event.id).where(Event.deleted_at.is_not(None)))).all()
+        for event_id in event_ids:
+            await self.purge_event(session, event_id, batch_size)
+            totals["events"] += 1
+
+        logger.info("Purged %(users)s users and %(events)s events", totals)
+        return totals
+
+purge_service = PurgeService()
+
+async def main() -> None:
+    from app.db.async_session import async_session
+    async with async_session() as session:
+        totals = await purge_service.run(session)
+    print(totals)
+
+if __name__ == "__main__":
+    # Sweeps up soft-deleted rows whose background purge did not finish:
+    # uv run python -m app.services.purge_service
+    asyncio.run(main())
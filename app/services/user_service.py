@@ -1,4 +1,5 @@
 from typing import Optional
+from datetime import datetime, timezone
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
@@ -8,7 +9,7 @@ from app.core.utils import generate_password_hash, verify_password
 
 class UserService:
     async def get_user_by_email(self, session: AsyncSession, email: str) -> Optional[User]:
-        statement = select(User).where(User.email == email)
+        statement = select(User).where(User.email == email, User.deleted_at.is_(None))
         result = await session.exec(statement)
         return result.first()
     
@@ -57,4 +58,12 @@ class UserService:
         await session.refresh(user)
         return user
 
+    async def delete_user(self, session: AsyncSession, user: User) -> None:
+        """Soft delete: the account disappears now, PurgeService removes its data in batches."""
+        user.deleted_at = datetime.now(timezone.utc)
+        # Free the unique email right away so the address can sign up again before the purge
+        user.email = f"deleted+{user.id}@deleted.invalid"
+        session.add(user)
+        await session.commit()
+
 user_service = UserService()
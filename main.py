@@ -1,22 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi.errors import RateLimitExceeded
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.middleware import SlowAPIMiddleware
 from app.core.rate_limiter import limiter
+from app.core.utils import shutdown_hash_pool
 from app.api.v1.routers import api_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await limiter.load_script()
+    yield
+    shutdown_hash_pool()
+
 app = FastAPI(
     title="Event Booking API",
     description="Event Booking API for managing events and bookings.",
     version="1.0.0",
     docs_url="/api/v1/docs",
-    redoc_url="/api/v1/redoc"
+    redoc_url="/api/v1/redoc",
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
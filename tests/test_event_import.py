@@ -0,0 +1,173 @@
+"""
+Unit tests for parsing and validating event uploads.
+
+The COPY and merge go through a stand-in session that records what would
+be copied, so no database (or asyncpg) is needed.
+"""
+import io
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.streaming import read_csv_rows, read_ndjson_rows
+from app.services import event_service as event_service_module
+from app.services.event_service import event_service
+
+FUTURE = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%S")
+PAST = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S")
+HEADER = "title,description,date,location,capacity"
+
+def csv_file(*lines: str) -> io.BytesIO:
+    return io.BytesIO("\n".join(lines).encode() + b"\n")
+
+def event_line(title: str, date: str = FUTURE, capacity: str = "50") -> str:
+    return f"{title},About {title},{date},Main Hall,{capacity}"
+
+class FakeDriverConnection:
+    def __init__(self):
+        self.copies: List[list] = []
+
+    async def copy_records_to_table(self, table: str, records: list, columns: list):
+        assert table == "event_import"
+        assert columns == event_service_module.IMPORT_COLUMNS
+        self.copies.append(list(records))
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+class FakeSession:
+    """Records COPY batches; the merge reports the given (line, repeated) rows as skipped."""
+    def __init__(self, skipped=()):
+        self.info = {}
+        self.driver = FakeDriverConnection()
+        self.skipped = [SimpleNamespace(line=line, repeated=repeated) for line, repeated in skipped]
+        self.committed = False
+
+    async def execute(self, statement, params=None):
+        return FakeResult(self.skipped)
+
+    async def connection(self):
+        driver = self.driver
+
+        class Connection:
+            async def get_raw_connection(self):
+                return SimpleNamespace(driver_connection=driver)
+
+        return Connection()
+
+    async def commit(self):
+        self.committed = True
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    async def bump_events_version():
+        pass
+    monkeypatch.setattr(event_service_module, "bump_events_version", bump_events_version)
+
+async def import_rows(session: FakeSession, rows):
+    return await event_service.import_events(session, rows, SimpleNamespace(id="organizer"))
+
+def copied_lines(session: FakeSession) -> List[List[int]]:
+    return [[record[0] for record in batch] for batch in session.driver.copies]
+
+def test_csv_rows_are_numbered_by_file_line():
+    rows = list(read_csv_rows(csv_file(HEADER, event_line("Alpha"), event_line("Beta"))))
+    assert [line for line, _ in rows] == [2, 3]
+    assert rows[0][1]["title"] == "Alpha"
+
+def test_csv_strips_the_byte_order_mark():
+    rows = list(read_csv_rows(io.BytesIO(("﻿" + HEADER + "\n" + event_line("Alpha") + "\n").encode())))
+    assert "title" in rows[0][1]
+
+def test_csv_rejects_cells_past_the_header():
+    rows = list(read_csv_rows(csv_file(HEADER, event_line("Alpha") + ",extra")))
+    assert rows == [(2, "Expected 5 columns, got 6")]
+
+def test_csv_leaves_the_upload_open():
+    file = csv_file(HEADER, event_line("Alpha"))
+    list(read_csv_rows(file))
+    assert not file.closed
+
+def test_ndjson_reports_bad_lines_and_skips_blank_ones():
+    file = io.BytesIO(b'{"title": "Alpha"}\n\n[1, 2]\nnot json\n')
+    assert list(read_ndjson_rows(file)) == [
+        (1, {"title": "Alpha"}),
+        (3, "Expected a JSON object"),
+        (4, "Invalid JSON"),
+    ]
+
+async def test_invalid_rows_are_reported_and_valid_ones_copied():
+    session = FakeSession()
+    rows = read_csv_rows(csv_file(
+        HEADER,
+        event_line("Alpha"),
+        event_line("Past event", date=PAST),
+        event_line("Beta", capacity="0"),
+        event_line("Gamma") + ",extra",
+        event_line("Delta"),
+    ))
+
+    imported, errors = await import_rows(session, rows)
+
+    assert imported == 2
+    assert copied_lines(session) == [[2, 6]]
+    assert [(error.line, error.errors) for error in errors] == [
+        (3, ["date: Value error, Event date must be in the future"]),
+        (4, ["capacity: Input should be greater than 0"]),
+        (5, ["Expected 5 columns, got 6"]),
+    ]
+    assert session.committed
+    # COPY bypasses the ORM, so the write is flagged by hand
+    assert session.info["txn_wrote"]
+
+async def test_header_mismatch_fails_every_row():
+    session = FakeSession()
+    rows = read_csv_rows(csv_file("name,description,date,location,capacity", "Alpha,About,2099-01-01,Main Hall,5"))
+
+    imported, errors = await import_rows(session, rows)
+
+    assert imported == 0
+    assert session.driver.copies == []
+    assert [(error.line, error.errors) for error in errors] == [(2, ["title: Field required"])]
+
+async def test_duplicates_from_the_merge_are_reported_in_line_order():
+    session = FakeSession(skipped=[(5, True), (3, False)])
+    rows = read_csv_rows(csv_file(
+        HEADER, event_line("Alpha"), event_line("Beta"), event_line("Gamma", capacity="x"), event_line("Alpha"),
+    ))
+
+    imported, errors = await import_rows(session, rows)
+
+    assert imported == 1
+    assert [error.line for error in errors] == [3, 4, 5]
+    assert errors[0].errors == ["You have already created an event with this title, date, and location."]
+    assert errors[2].errors == ["Duplicate of an earlier row in this file"]
+
+@pytest.mark.parametrize("valid, batches", [(4, [2, 2]), (5, [2, 2, 1]), (1, [1])])
+async def test_rows_are_copied_in_batches(monkeypatch, valid, batches):
+    monkeypatch.setattr(event_service_module, "IMPORT_COPY_BATCH", 2)
+    session = FakeSession()
+    rows = read_csv_rows(csv_file(HEADER, *(event_line(f"Event {i}") for i in range(valid))))
+
+    imported, errors = await import_rows(session, rows)
+
+    assert imported == valid
+    assert not errors
+    assert [len(batch) for batch in session.driver.copies] == batches
+
+async def test_row_limit(monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_IMPORT_MAX_ROWS", 2)
+    session = FakeSession()
+    rows = read_csv_rows(csv_file(HEADER, *(event_line(f"Event {i}") for i in range(3))))
+
+    with pytest.raises(HTTPException) as raised:
+        await import_rows(session, rows)
+    assert raised.value.status_code == 413
+    assert not session.committed
@@ -0,0 +1,190 @@
+"""
+Query-plan regression tests for the service layer.
+
+Each test runs one service read path against seeded rows inside a rolled-back
+transaction, EXPLAINs every SELECT it issues and checks that the index meant
+to serve it appears in the plan. Sequential scans are disabled, so a Seq Scan
+that survives means no index can serve the query at all; checking index names
+also catches the planner falling back to a full primary-key scan or a merge
+join once the intended index is missing.
+
+Needs a migrated PostgreSQL database (the DB_* settings); skipped otherwise.
+"""
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.async_session import engine
+from app.db.models.booking import Booking
+from app.db.models.event import Event
+from app.db.models.user import User
+from app.services.event_service import event_service
+from app.services.booking_service import booking_service
+from app.services.admin_service import admin_service
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+SEED_MARK = "query-plan-seed"
+
+# Mostly past events, like a live system; enough rows that an index beats a
+# filtered scan of the primary key
+SEED = [
+    f"""
+    INSERT INTO "user" (id, email, password, role)
+    SELECT gen_random_uuid(), '{SEED_MARK}-organizer-' || i || '@example.com', 'x', 'organizer'
+    FROM generate_series(1, 50) i
+    """,
+    f"""
+    INSERT INTO "user" (id, email, password, role)
+    SELECT gen_random_uuid(), '{SEED_MARK}-attendee-' || i || '@example.com', 'x', 'attendee'
+    FROM generate_series(1, 1000) i
+    """,
+    f"""
+    WITH organizers AS (
+        SELECT id, row_number() OVER (ORDER BY id) AS n FROM "user" WHERE email LIKE '{SEED_MARK}-organizer-%'
+    )
+    INSERT INTO event (id, title, description, date, location, capacity, booked_seats, organizer_id)
+    SELECT gen_random_uuid(), 'Event ' || i, '{SEED_MARK}', now() + ((i - 1900) || ' hours')::interval,
+           'City ' || i % 20, 100, 0, organizers.id
+    FROM generate_series(1, 2000) i JOIN organizers ON organizers.n = 1 + i % 50
+    """,
+    f"""
+    WITH attendees AS (
+        SELECT id, row_number() OVER (ORDER BY id) AS n FROM "user" WHERE email LIKE '{SEED_MARK}-attendee-%'
+    ), events AS (
+        SELECT id, row_number() OVER (ORDER BY id) AS n FROM event WHERE description = '{SEED_MARK}'
+    )
+    INSERT INTO booking (id, user_id, event_id, booking_date, status)
+    SELECT gen_random_uuid(), attendees.id, events.id, now() - (i || ' minutes')::interval,
+           (CASE WHEN i % 10 = 0 THEN 'cancelled' ELSE 'confirmed' END)::booking_status_enum
+    FROM generate_series(1, 20000) i
+    JOIN attendees ON attendees.n = 1 + i % 1000
+    JOIN events ON events.n = 1 + (i / 1000 + i * 7) % 2000
+    """,
+    'ANALYZE "user", event, booking, event_archive, booking_archive',
+]
+
+ServiceCall = Callable[[AsyncSession, Dict[str, Any]], Awaitable[Any]]
+
+# (service call, indexes its plans must use)
+CASES: Dict[str, Tuple[ServiceCall, Set[str]]] = {
+    "event_service.get_all_events": (
+        lambda s, ids: event_service.get_all_events(s),
+        {"ix_event_date"},
+    ),
+    "event_service.search_events": (
+        lambda s, ids: event_service.search_events(s, query="a"),
+        {"ix_event_date"},
+    ),
+    "event_service.get_event_by_id": (
+        lambda s, ids: event_service.get_event_by_id(s, ids["event_id"]),
+        {"event_pkey"},
+    ),
+    "event_service.get_event_titles": (
+        lambda s, ids: event_service.get_event_titles(s, [ids["event_id"]]),
+        {"event_pkey"},
+    ),
+    "event_service.get_organizer_events": (
+        lambda s, ids: event_service.get_organizer_events(s, ids["organizer_id"], limit=20),
+        {"ix_event_organizer_id_date", "ix_event_archive_organizer_id_date"},
+    ),
+    "booking_service.get_user_bookings": (
+        lambda s, ids: booking_service.get_user_bookings(s, ids["attendee_id"], limit=20),
+        {"ix_booking_user_id_booking_date", "ix_booking_archive_user_id_booking_date"},
+    ),
+    "booking_service.get_event_attendees": (
+        lambda s, ids: booking_service.get_event_attendees(s, ids["event_id"]),
+        {"ix_booking_event_id_confirmed"},
+    ),
+    "admin_service.list_attendees": (
+        lambda s, ids: admin_service.list_attendees(s),
+        {"ix_user_role_id"},
+    ),
+    "admin_service.list_organizers": (
+        lambda s, ids: admin_service.list_organizers(s),
+        {"ix_user_role_id"},
+    ),
+}
+
+def plan_nodes(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+async def sample_ids(session: AsyncSession) -> Dict[str, Any]:
+    """The busiest seeded event, attendee and organizer, so plans see realistic row counts."""
+    seeded = Event.description == SEED_MARK
+    event_id = (await session.exec(
+        select(Booking.event_id).join(Event, Event.id == Booking.event_id).where(seeded)
+        .group_by(Booking.event_id).order_by(func.count().desc()).limit(1)
+    )).first()
+    attendee_id = (await session.exec(
+        select(Booking.user_id).join(User, User.id == Booking.user_id).where(User.email.startswith(SEED_MARK))
+        .group_by(Booking.user_id).order_by(func.count().desc()).limit(1)
+    )).first()
+    organizer_id = (await session.exec(
+        select(Event.organizer_id).where(seeded).group_by(Event.organizer_id).order_by(func.count().desc()).limit(1)
+    )).first()
+    return {"event_id": event_id, "attendee_id": attendee_id, "organizer_id": organizer_id}
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def seeded():
+    try:
+        conn = await engine.connect()
+    except Exception as e:
+        pytest.skip(f"Database unavailable: {e}")
+
+    trans = await conn.begin()
+    try:
+        for statement in SEED:
+            await conn.exec_driver_sql(statement)
+        await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        session = AsyncSession(bind=conn)
+        yield conn, session, await sample_ids(session)
+    finally:
+        await trans.rollback()
+        await conn.close()
+        await engine.dispose()
+
+async def explain(conn, session: AsyncSession, call: Callable[[AsyncSession], Awaitable[Any]]) -> List[Dict[str, Any]]:
+    """Plans of every SELECT the call issues."""
+    captured = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip(" (\n").upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    event.listen(conn.sync_connection, "before_cursor_execute", capture)
+    try:
+        session.expunge_all()
+        await call(session)
+    finally:
+        event.remove(conn.sync_connection, "before_cursor_execute", capture)
+
+    plans = []
+    for statement, parameters in captured:
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        plans.append(plan[0]["Plan"])
+    return plans
+
+@pytest.mark.parametrize("name", CASES)
+async def test_service_query_uses_index(seeded, name):
+    conn, session, ids = seeded
+    call, expected = CASES[name]
+
+    plans = await explain(conn, session, lambda s: call(s, ids))
+    assert plans, f"{name} issued no SELECT"
+
+    nodes = [node for plan in plans for node in plan_nodes(plan)]
+    seq_scans = sorted({node.get("Relation Name") for node in nodes if node["Node Type"] == "Seq Scan"})
+    assert not seq_scans, f"{name}: Seq Scan on {', '.join(seq_scans)}"
+
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    missing = expected - used
+    assert not missing, f"{name} does not use {', '.join(sorted(missing))} (uses {', '.join(sorted(used)) or 'no index'})"
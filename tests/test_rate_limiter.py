@@ -0,0 +1,133 @@
+"""
+Unit tests for the GCRA rate limiter and its local token leases.
+
+The Lua script runs inside fakeredis (lupa), so the Redis side is the real
+algorithm; the limiter's clock is replaced so lease expiry is deterministic.
+"""
+from types import SimpleNamespace
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core import rate_limiter
+from app.core.config import settings
+from app.core.rate_limiter import RateLimiter, parse_rate, LOCAL_SWEEP_SECONDS
+from app.core.redis import RedisBatch
+
+KEY = "scope:user:1"
+NAME = f"ratelimit:{KEY}"
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+@pytest_asyncio.fixture
+async def limiter(monkeypatch, redis, clock):
+    monkeypatch.setattr(rate_limiter, "redis_client", redis)
+    limiter = RateLimiter()
+    await limiter.load_script()
+    return limiter
+
+async def hit(limiter: RateLimiter, batch: RedisBatch, limit: int = 10, period: int = 60):
+    return await limiter.hit(KEY, limit, period, batch)
+
+def test_parse_rate():
+    assert parse_rate("5/minute") == (5, 60)
+    assert parse_rate("10/Seconds") == (10, 1)
+    with pytest.raises(ValueError):
+        parse_rate("5/fortnight")
+
+async def test_allows_up_to_the_limit_then_denies(limiter, redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOCAL_FRACTION", 0)
+
+    for _ in range(5):
+        assert await hit(limiter, RedisBatch(redis), limit=5) == (True, 0)
+    # The sixth token is one emission interval (60s / 5) away
+    assert await hit(limiter, RedisBatch(redis), limit=5) == (False, 12)
+    assert not limiter._local
+
+async def test_lease_is_spent_locally(limiter, redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOCAL_FRACTION", 0.5)
+
+    assert await hit(limiter, RedisBatch(redis)) == (True, 0)
+    assert limiter._local[KEY] == (4, 1000.0 + 30)
+
+    for remaining in (3, 2, 1, 0):
+        batch = RedisBatch(redis)
+        assert await hit(limiter, batch) == (True, 0)
+        assert not batch.has(NAME)
+        assert limiter._local[KEY][0] == remaining
+
+async def test_lease_falls_back_to_single_tokens_at_the_boundary(limiter, redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOCAL_FRACTION", 0.5)
+
+    # Two leases of 5 use up the budget of 10
+    for _ in range(10):
+        assert await hit(limiter, RedisBatch(redis)) == (True, 0)
+
+    allowed, retry_after = await hit(limiter, RedisBatch(redis))
+    assert not allowed
+    assert retry_after == 6
+    assert KEY not in limiter._local
+
+async def test_expired_lease_goes_back_to_redis(limiter, redis, clock, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOCAL_FRACTION", 0.5)
+    assert await hit(limiter, RedisBatch(redis)) == (True, 0)
+
+    clock.now += 30
+    batch = RedisBatch(redis)
+    assert await hit(limiter, batch) == (True, 0)
+    assert batch.has(NAME)
+    # A fresh lease replaced the expired one
+    assert limiter._local[KEY] == (4, clock.now + 30)
+
+async def test_sweep_drops_expired_leases(limiter, clock):
+    limiter._local = {"expired": (3, clock.now - 1), "live": (3, clock.now + LOCAL_SWEEP_SECONDS + 1)}
+    limiter._sweep()
+    assert set(limiter._local) == {"live"}
+
+    # Not again until LOCAL_SWEEP_SECONDS have passed
+    limiter._local["expired"] = (3, clock.now - 1)
+    limiter._sweep()
+    assert "expired" in limiter._local
+
+    clock.now += LOCAL_SWEEP_SECONDS
+    limiter._sweep()
+    assert "expired" not in limiter._local
+
+async def test_guard_key_takes_no_budget(limiter, redis):
+    await redis.set("revoked-jti", "")
+    batch = RedisBatch(redis)
+    limiter._queue(batch, KEY, 10, 60, guard="revoked-jti")
+
+    assert await batch.get(NAME) == [-1, 0]
+    assert await redis.get(NAME) is None
+
+async def test_reloads_script_after_noscript(limiter, redis):
+    await redis.script_flush()
+    assert await hit(limiter, RedisBatch(redis)) == (True, 0)
+    assert await redis.get(NAME) is not None
+
+async def test_fails_open_when_redis_is_down(limiter):
+    class DownPipeline:
+        async def __aenter__(self):
+            raise ConnectionError("Redis is down")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    down = SimpleNamespace(pipeline=lambda transaction: DownPipeline())
+    assert await hit(limiter, RedisBatch(down)) == (True, 0)
@@ -0,0 +1,81 @@
+"""Unit tests for RedisBatch, against a recorded stand-in for the pipeline."""
+from typing import Any, List
+import pytest
+
+from app.core.redis import RedisBatch
+
+class FakePipeline:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+        self.queued: List[tuple] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get(self, key: str):
+        self.queued.append(("get", key))
+
+    def exists(self, key: str):
+        self.queued.append(("exists", key))
+
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        self.client.executed.append(self.queued)
+        return [self.client.replies[command] for command in self.queued]
+
+class FakeClient:
+    def __init__(self, replies):
+        self.replies = replies
+        self.executed: List[List[tuple]] = []
+
+    def pipeline(self, transaction: bool):
+        assert not transaction
+        return FakePipeline(self)
+
+async def test_queued_commands_share_one_pipeline():
+    client = FakeClient({("get", "a"): b"1", ("exists", "b"): 0, ("get", "c"): b"3"})
+    batch = RedisBatch(client)
+    batch.add("a", lambda pipe: pipe.get("a"))
+    batch.add("b", lambda pipe: pipe.exists("b"))
+    batch.add("c", lambda pipe: pipe.get("c"))
+
+    # The first get sends everything queued; the rest are already resolved
+    assert await batch.get("c") == b"3"
+    assert await batch.get("a") == b"1"
+    assert await batch.get("b") == 0
+    assert client.executed == [[("get", "a"), ("exists", "b"), ("get", "c")]]
+
+async def test_duplicate_names_are_queued_once():
+    client = FakeClient({("get", "a"): b"1"})
+    batch = RedisBatch(client)
+    batch.add("a", lambda pipe: pipe.get("a"))
+    batch.add("a", lambda pipe: pipe.exists("a"))
+
+    assert await batch.get("a") == b"1"
+    batch.add("a", lambda pipe: pipe.exists("a"))
+    assert await batch.get("a") == b"1"
+    assert client.executed == [[("get", "a")]]
+
+async def test_commands_added_later_go_in_a_new_round_trip():
+    client = FakeClient({("get", "a"): b"1", ("get", "b"): b"2"})
+    batch = RedisBatch(client)
+    batch.add("a", lambda pipe: pipe.get("a"))
+    assert await batch.get("a") == b"1"
+
+    batch.add("b", lambda pipe: pipe.get("b"))
+    assert batch.has("b")
+    assert await batch.get("b") == b"2"
+    assert client.executed == [[("get", "a")], [("get", "b")]]
+
+async def test_an_error_reaches_only_its_caller():
+    client = FakeClient({("get", "a"): b"1", ("get", "b"): ValueError("WRONGTYPE")})
+    batch = RedisBatch(client)
+    batch.add("a", lambda pipe: pipe.get("a"))
+    batch.add("b", lambda pipe: pipe.get("b"))
+
+    with pytest.raises(ValueError, match="WRONGTYPE"):
+        await batch.get("b")
+    assert await batch.get("a") == b"1"
+    assert len(client.executed) == 1
@@ -0,0 +1,107 @@
+"""Unit tests for server-sent event framing, heartbeats and client disconnects."""
+import asyncio
+from typing import List, Optional
+import pytest
+
+from app.core.streaming import EventSourceResponse, sse_stream
+from app.schemas.chatbot import ChatDone, ChatToken, ChatToolEnd, ChatToolStart
+
+HEARTBEAT = 0.05
+PING = ": ping\n\n"
+
+async def producer(log: List[str], pause: float):
+    try:
+        yield ChatToolStart(tool="list_events")
+        await asyncio.sleep(pause)
+        yield ChatToolEnd(tool="list_events", ok=True)
+        yield ChatToken(text="hi")
+        yield ChatDone()
+    except asyncio.CancelledError:
+        log.append("cancelled")
+        raise
+    finally:
+        log.append("closed")
+
+async def test_events_are_framed_with_their_type():
+    log = []
+    frames = [frame async for frame in sse_stream(producer(log, 0), HEARTBEAT)]
+
+    assert frames == [
+        'event: tool-start\ndata: {"tool":"list_events"}\n\n',
+        'event: tool-end\ndata: {"tool":"list_events","ok":true}\n\n',
+        'event: token\ndata: {"text":"hi"}\n\n',
+        "event: done\ndata: {}\n\n",
+    ]
+    assert log == ["closed"]
+
+async def test_pings_fill_silences_longer_than_the_heartbeat():
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    frames = []
+    async for frame in sse_stream(producer([], 3.5 * HEARTBEAT), HEARTBEAT):
+        frames.append((loop.time() - start, frame))
+
+    pings = [at for at, frame in frames if frame == PING]
+    assert [frame == PING for _, frame in frames] == [False, True, True, True, False, False, False]
+    for n, at in enumerate(pings, start=1):
+        assert at == pytest.approx(n * HEARTBEAT, abs=HEARTBEAT / 2)
+
+async def test_no_pings_while_events_flow():
+    frames = [frame async for frame in sse_stream(producer([], HEARTBEAT / 2), HEARTBEAT)]
+    assert PING not in frames
+
+async def test_closing_the_stream_cancels_the_producer():
+    log = []
+    stream = sse_stream(producer(log, 10), HEARTBEAT)
+    assert (await anext(stream)).startswith("event: tool-start")
+    assert await anext(stream) == PING
+
+    await stream.aclose()
+    assert log == ["cancelled", "closed"]
+
+async def run_response(events, disconnect_after: Optional[float] = None):
+    """Serve an EventSourceResponse; returns the response headers and body."""
+    sent = []
+    gone = asyncio.Event()
+
+    async def receive():
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    async def client():
+        if disconnect_after is not None:
+            await asyncio.sleep(disconnect_after)
+            gone.set()
+
+    response = EventSourceResponse(sse_stream(events, HEARTBEAT))
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    await asyncio.wait_for(asyncio.gather(response(scope, receive, send), client()), timeout=2)
+    headers = dict(sent[0]["headers"])
+    body = b"".join(message.get("body", b"") for message in sent[1:]).decode()
+    return headers, body
+
+async def test_response_ends_with_the_stream():
+    log = []
+    headers, body = await run_response(producer(log, 0))
+
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert headers[b"cache-control"] == b"no-cache"
+    assert headers[b"x-accel-buffering"] == b"no"
+    assert body.endswith("event: done\ndata: {}\n\n")
+    assert log == ["closed"]
+
+async def test_disconnect_stops_the_stream():
+    log = []
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    _, body = await run_response(producer(log, 10), disconnect_after=2.5 * HEARTBEAT)
+
+    # Ended at the disconnect, not when the producer would have finished
+    assert loop.time() - start < 1
+    assert body.startswith("event: tool-start")
+    assert PING in body
+    assert "event: done" not in body
+    assert log == ["cancelled", "closed"]
@@ -0,0 +1,106 @@
+"""
+Unit tests for validating and batching user uploads.
+
+Each batch's hash/COPY/merge step is replaced by a recorder, so no database
+(or asyncpg) is needed.
+"""
+import io
+from typing import List, Tuple
+import pytest
+
+from app.core.config import settings
+from app.core.streaming import read_csv_rows
+from app.schemas.admin import UserImportError, UserImportProgress, UserImportRow
+from app.services.admin_service import admin_service
+
+HASH = "$argon2id$v=19$m=65536,t=3,p=4$c2FsdA$aGFzaA"
+
+def csv_file(*lines: str) -> io.BytesIO:
+    return io.BytesIO("\n".join(lines).encode() + b"\n")
+
+@pytest.fixture
+def batches(monkeypatch) -> List[List[Tuple[int, UserImportRow]]]:
+    """Batches handed to the COPY step; emails starting with "taken" come back as skipped."""
+    batches = []
+
+    async def import_user_batch(session, batch):
+        batches.append(list(batch))
+        return [line for line, row in batch if row.email.startswith("taken")]
+
+    monkeypatch.setattr(admin_service, "_import_user_batch", import_user_batch)
+    return batches
+
+async def import_rows(file: io.BytesIO) -> list:
+    return [event async for event in admin_service.import_users(None, read_csv_rows(file))]
+
+def errors_of(events: list) -> List[Tuple[int, List[str]]]:
+    return [(event.line, event.errors) for event in events if isinstance(event, UserImportError)]
+
+def test_row_needs_exactly_one_password():
+    assert UserImportRow.model_validate({"email": "a@example.com", "password": "secret123"}).role.value == "attendee"
+    assert UserImportRow.model_validate({"email": "a@example.com", "password": "", "password_hash": HASH}).password is None
+
+    for row in ({"email": "a@example.com"}, {"email": "a@example.com", "password": "secret123", "password_hash": HASH}):
+        with pytest.raises(ValueError, match="exactly one of password or password_hash"):
+            UserImportRow.model_validate(row)
+
+def test_row_rejects_other_hashes():
+    with pytest.raises(ValueError, match="argon2"):
+        UserImportRow.model_validate({"email": "a@example.com", "password_hash": "$2b$12$bcrypt"})
+
+def test_empty_role_means_attendee():
+    assert UserImportRow.model_validate({"email": "a@example.com", "password": "secret123", "role": ""}).role.value == "attendee"
+
+async def test_bad_rows_are_reported_and_the_rest_imported(batches):
+    events = await import_rows(csv_file(
+        "email,password,role",
+        "a@example.com,secret123,organizer",
+        "not-an-email,secret123,",
+        "b@example.com,short,",
+        "c@example.com,secret123,admin",
+        "d@example.com,secret123,,extra",
+        "e@example.com,secret123,",
+    ))
+
+    assert [[line for line, _ in batch] for batch in batches] == [[2, 7]]
+    assert [line for line, _ in errors_of(events)] == [3, 4, 5, 6]
+    assert errors_of(events)[3] == (6, ["Expected 3 columns, got 4"])
+    assert events[-1] == UserImportProgress(processed=6, imported=2, failed=4, done=True)
+
+async def test_header_mismatch_fails_every_row(batches):
+    events = await import_rows(csv_file("mail,password", "a@example.com,secret123", "b@example.com,secret123"))
+
+    assert batches == []
+    assert errors_of(events) == [(2, ["email: Field required"]), (3, ["email: Field required"])]
+    assert events[-1] == UserImportProgress(processed=2, failed=2, done=True)
+
+@pytest.mark.parametrize("rows, sizes", [(4, [2, 2]), (5, [2, 2, 1]), (1, [1])])
+async def test_batches_and_progress(monkeypatch, batches, rows, sizes):
+    monkeypatch.setattr(settings, "USER_IMPORT_BATCH_SIZE", 2)
+    events = await import_rows(csv_file("email,password", *(f"u{i}@example.com,secret123" for i in range(rows))))
+
+    assert [len(batch) for batch in batches] == sizes
+    progress = [event for event in events if isinstance(event, UserImportProgress)]
+    # One report per full batch, then the final one
+    assert [p.imported for p in progress] == [2 * (i + 1) for i in range(rows // 2)] + [rows]
+    assert [p.done for p in progress] == [False] * (rows // 2) + [True]
+
+async def test_registered_emails_are_skipped(monkeypatch, batches):
+    monkeypatch.setattr(settings, "USER_IMPORT_BATCH_SIZE", 2)
+    events = await import_rows(csv_file("email,password", "taken@example.com,secret123", "new@example.com,secret123"))
+
+    assert errors_of(events) == [(2, ["Email already registered"])]
+    assert events[-1] == UserImportProgress(processed=2, imported=1, skipped=1, done=True)
+
+async def test_unreadable_file_ends_the_import_in_band(monkeypatch, batches):
+    monkeypatch.setattr(settings, "USER_IMPORT_BATCH_SIZE", 500)
+    # Far past the reader's first chunk, so some rows decode before the bad bytes
+    lines = "".join(f"u{i}@example.com,secret123\n" for i in range(2000))
+    events = await import_rows(io.BytesIO(b"email,password\n" + lines.encode() + b"\xff\xfe\n"))
+
+    final = events[-1]
+    assert final.done and 0 < final.processed < 2000
+    assert final.imported == final.processed == sum(len(batch) for batch in batches)
+    [(line, [message])] = errors_of(events)
+    assert line == final.processed + 1
+    assert message.startswith("Could not read file")